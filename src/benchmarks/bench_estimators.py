@@ -0,0 +1,197 @@
+import sys
+import os
+import copy
+import tracemalloc
+from functools import partial
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+
+from estimators.space_saving import SpaceSaving
+from estimators.rap import RandomAdmissionPolicy
+from estimators.mean_tail import MeanTail
+from estimators.count_min import CountMin
+from estimators.frequent import Frequent, BatchedFrequent
+from estimators.effective_space_saving import EffectiveSpaceSaving
+from estimators.stream_summary import StreamSummary
+from estimators.min_heap import IndexedMinHeap
+from estimators.array_table import ArrayTable
+import misc.distribution as dist
+
+# Update and query throughput of every estimator and of the structures they
+# are built on, with pytest-benchmark. The bench_ prefix keeps the suite out
+# of the default test run, run it explicitly and keep the JSON:
+#   python -m pytest src/benchmarks/bench_estimators.py --benchmark-json=bench.json
+# or --benchmark-autosave, then --benchmark-compare --benchmark-compare-fail=mean:10%
+# to catch regressions. Select a subset with -k, e.g. -k "SS and 4096".
+# Every benchmark first warms its estimator up with a stream of the same
+# skew until it is full, then times OPS operations on a copy of it. Besides
+# the timings, the JSON extra_info has ns_per_op, ops_per_sec and the peak and
+# retained allocations per op, measured by tracemalloc on an untimed run.
+# The weighted benchmarks count bytes: every packet has a size drawn from a
+# trimodal mix of minimum, middle and full-MTU Ethernet packets.
+
+SIZES = [2**e for e in range(8, 19, 2)]
+SKEWS = [0.0, 1.1, 1.5, 2.0]  # 0.0 is uniform, the rest Zipf exponents
+HIT_RATIOS = [0.0, 0.5, 1.0]
+QUERY_SKEW = 1.1
+OPS = 2**12
+ROUNDS = 3
+PACKET_SIZES = [64, 576, 1500]
+PACKET_SIZE_SHARES = [0.5, 0.2, 0.3]
+WEIGHTED = ["SS", "RAP", "RAP-array", "MT", "MT-array", "FR", "FR-batched", "ESS"]
+
+ESTIMATORS = {
+    "SS": SpaceSaving,
+    "RAP": RandomAdmissionPolicy,
+    "RAP-array": partial(RandomAdmissionPolicy, backend="array"),
+    "MT": partial(MeanTail, mem_percentage_tail=0.125),
+    "MT-array": partial(MeanTail, mem_percentage_tail=0.125, backend="array"),
+    "CM": lambda size: CountMin(size // 4, 4, seed=0),
+    "FR": Frequent,
+    "FR-batched": BatchedFrequent,
+    "ESS": partial(EffectiveSpaceSaving, mem_percentage_candidates=0.125, seed=0),
+}
+
+# space-saving style counting on the bare structures: increment a tracked
+# key, otherwise evict the minimum once full
+def summary_update(summary, size, key):
+    if key in summary:
+        summary.increment(key, 1)
+    elif len(summary) < size:
+        summary.insert(key, 1)
+    else:
+        summary.insert(key, summary.pop_min()[1] + 1)
+
+def heap_update(heap, size, key):
+    if key in heap:
+        heap.increment(key, 1)
+    elif len(heap) < size:
+        heap.insert(key, 1)
+    else:
+        heap.replace_min(key, heap.peek_min()[1] + 1)
+
+def table_update(table, size, key):
+    table[key] = table.get(key, 0) + 1
+
+STRUCTURES = {
+    "StreamSummary": (lambda size: StreamSummary(), summary_update),
+    "IndexedMinHeap": (lambda size: IndexedMinHeap(size), heap_update),
+    "IndexedMinHeap-array": (lambda size: IndexedMinHeap(size, backend="array"), heap_update),
+    "ArrayTable": (lambda size: ArrayTable(size), table_update),
+}
+
+def stream(size, skew, n, seed):
+    # keys from a domain 4 times the table size, key 0 the most frequent
+    if skew == 0.0:
+        distribution = dist.UniformDistribution(4 * size, rng=seed)
+    else:
+        distribution = dist.ZipfianDistribution(4 * size, skew, rng=seed)
+    return distribution.generate(n)
+
+def packet_sizes(n, seed):
+    return np.random.default_rng(seed).choice(PACKET_SIZES, n, p=PACKET_SIZE_SHARES)
+
+_warm = {}
+
+def warm(name, size, skew, weighted=False):
+    # estimators are warmed up once and copied for every round
+    if (name, size, skew, weighted) not in _warm:
+        if name in ESTIMATORS:
+            estimator = ESTIMATORS[name](size)
+            keys = stream(size, skew, 4 * size, 0)
+            estimator.update_many(keys, packet_sizes(len(keys), 0) if weighted else None)
+        else:
+            factory, update = STRUCTURES[name]
+            estimator = factory(size)
+            for key in stream(size, skew, 4 * size, 0).tolist():
+                update(estimator, size, key)
+        _warm[(name, size, skew, weighted)] = estimator
+    return _warm[(name, size, skew, weighted)]
+
+def measure(benchmark, run, setup, ops):
+    benchmark.pedantic(run, setup=setup, rounds=ROUNDS)
+    args, _ = setup()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start, _ = tracemalloc.get_traced_memory()
+    run(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    benchmark.extra_info["peak_bytes_per_op"] = (peak - start) / ops
+    benchmark.extra_info["retained_bytes_per_op"] = (current - start) / ops
+    benchmark.extra_info["retained_blocks_per_op"] = blocks / ops
+    if benchmark.stats is not None:
+        mean = benchmark.stats.stats.mean
+        benchmark.extra_info["ns_per_op"] = mean / ops * 1e9
+        benchmark.extra_info["ops_per_sec"] = ops / mean
+
+@pytest.mark.parametrize("skew", SKEWS)
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("name", list(ESTIMATORS))
+def test_update(benchmark, name, size, skew):
+    estimator = warm(name, size, skew)
+    keys = stream(size, skew, OPS, 1).tolist()
+
+    def run(estimator):
+        update = estimator.update
+        for key in keys:
+            update(key, 1)
+
+    measure(benchmark, run, lambda: ((copy.deepcopy(estimator),), {}), OPS)
+
+@pytest.mark.parametrize("skew", SKEWS)
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("name", list(ESTIMATORS))
+def test_update_many(benchmark, name, size, skew):
+    estimator = warm(name, size, skew)
+    keys = stream(size, skew, OPS, 1)
+    measure(benchmark, lambda estimator: estimator.update_many(keys),
+            lambda: ((copy.deepcopy(estimator),), {}), OPS)
+
+@pytest.mark.parametrize("skew", SKEWS)
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("name", WEIGHTED)
+def test_update_many_weighted(benchmark, name, size, skew):
+    estimator = warm(name, size, skew, weighted=True)
+    keys = stream(size, skew, OPS, 1)
+    sizes = packet_sizes(OPS, 1)
+    measure(benchmark, lambda estimator: estimator.update_many(keys, sizes),
+            lambda: ((copy.deepcopy(estimator),), {}), OPS)
+
+@pytest.mark.parametrize("hit_ratio", HIT_RATIOS)
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("name", list(ESTIMATORS))
+def test_query(benchmark, name, size, hit_ratio):
+    # hits are keys of the warm-up stream, misses keys never seen
+    estimator = warm(name, size, QUERY_SKEW)
+    rng = np.random.default_rng(2)
+    seen = np.unique(stream(size, QUERY_SKEW, 4 * size, 0))
+    hits = int(hit_ratio * OPS)
+    keys = np.concatenate([rng.choice(seen, hits), rng.integers(2**40, 2**41, OPS - hits, dtype=np.uint64)])
+    keys = rng.permutation(keys).tolist()
+
+    def run(estimator):
+        query = estimator.query
+        for key in keys:
+            query(key)
+
+    measure(benchmark, run, lambda: ((estimator,), {}), OPS)
+
+@pytest.mark.parametrize("skew", SKEWS)
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("name", list(STRUCTURES))
+def test_structure_update(benchmark, name, size, skew):
+    structure = warm(name, size, skew)
+    update = STRUCTURES[name][1]
+    keys = stream(size, skew, OPS, 1).tolist()
+
+    def run(structure):
+        for key in keys:
+            update(structure, size, key)
+
+    measure(benchmark, run, lambda: ((copy.deepcopy(structure),), {}), OPS)
@@ -0,0 +1,155 @@
+import numpy as np
+
+GOLDEN = 0x9E3779B97F4A7C15
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+class ArrayTable:
+    # Open-addressing hash table of non-negative integer keys backed by
+    # parallel NumPy arrays (keys, values, occupancy), with linear probing
+    # and backward-shift deletion. Exposes the subset of the dict interface
+    # the estimators use, at a fixed number of bytes per slot.
+    # The number of slots is capacity / load_factor rather than the next
+    # power of two, a key's home slot is its 64-bit hash scaled to the table
+    # ((hash * slots) >> 64), so no memory is lost to rounding up.
+    def __init__(self, capacity, key_dtype=np.uint64, value_dtype=np.int64, load_factor=0.75):
+        self.key_dtype = key_dtype
+        self.value_dtype = value_dtype
+        self.load_factor = load_factor
+        self.count = 0
+        capacity = max(1, int(capacity))
+        slots = max(8, int(np.ceil(capacity / load_factor)))
+        while int(slots * load_factor) < capacity:
+            slots += 1
+        self._allocate(slots)
+
+    def _layout(self, slots):
+        self.slots = slots
+        self.limit = int(slots * self.load_factor)
+
+    def _allocate(self, slots):
+        self._layout(slots)
+        self.table_keys = np.zeros(slots, dtype=self.key_dtype)
+        self.table_values = np.zeros(slots, dtype=self.value_dtype)
+        self.occupied = np.zeros(slots, dtype=np.bool_)
+
+    @property
+    def nbytes(self):
+        return self.table_keys.nbytes + self.table_values.nbytes + self.occupied.nbytes
+
+    def _home(self, key):
+        return (((key * GOLDEN) & MASK64) * self.slots) >> 64
+
+    def _find(self, key):
+        # slot holding key, or the empty slot where it would be inserted
+        slots = self.slots
+        i = (((key * GOLDEN) & MASK64) * slots) >> 64
+        occupied, keys = self.occupied, self.table_keys
+        while occupied.item(i):
+            if keys.item(i) == key:
+                return i, True
+            i += 1
+            if i == slots:
+                i = 0
+        return i, False
+
+    def _grow(self):
+        keys, values = self.table_keys[self.occupied], self.table_values[self.occupied]
+        self._allocate(self.slots * 2)
+        self.count = 0
+        for key, value in zip(keys.tolist(), values.tolist()):
+            self[key] = value
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self._find(int(key))[1]
+
+    def __getitem__(self, key):
+        i, found = self._find(int(key))
+        if not found:
+            raise KeyError(key)
+        return self.table_values.item(i)
+
+    def get(self, key, default=None):
+        i, found = self._find(int(key))
+        return self.table_values.item(i) if found else default
+
+    def __setitem__(self, key, value):
+        key = int(key)
+        i, found = self._find(key)
+        if not found:
+            if self.count >= self.limit:
+                self._grow()
+                i, _ = self._find(key)
+            self.table_keys[i] = key
+            self.occupied[i] = True
+            self.count += 1
+        self.table_values[i] = value
+
+    def __delitem__(self, key):
+        i, found = self._find(int(key))
+        if not found:
+            raise KeyError(key)
+        self._delete_slot(i)
+
+    def pop(self, key):
+        i, found = self._find(int(key))
+        if not found:
+            raise KeyError(key)
+        value = self.table_values.item(i)
+        self._delete_slot(i)
+        return value
+
+    def _delete_slot(self, i):
+        occupied, keys, values, slots = self.occupied, self.table_keys, self.table_values, self.slots
+        j = i
+        while True:
+            j += 1
+            if j == slots:
+                j = 0
+            if not occupied.item(j):
+                break
+            home = self._home(keys.item(j))
+            # entries whose home slot lies cyclically in (i, j] stay put
+            if (i < home <= j) if i <= j else (home > i or home <= j):
+                continue
+            keys[i] = keys[j]
+            values[i] = values[j]
+            i = j
+        occupied[i] = False
+        self.count -= 1
+
+    def keys(self):
+        return self.table_keys[self.occupied].tolist()
+
+    def values(self):
+        return self.table_values[self.occupied].tolist()
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def state(self):
+        return {"count": self.count, "load_factor": self.load_factor}, {
+            "keys": self.table_keys, "values": self.table_values, "occupied": self.occupied}
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        table = cls.__new__(cls)
+        table.key_dtype = arrays["keys"].dtype.type
+        table.value_dtype = arrays["values"].dtype.type
+        table.load_factor = meta["load_factor"]
+        table.count = meta["count"]
+        table._layout(len(arrays["keys"]))
+        table.table_keys, table.table_values, table.occupied = arrays["keys"], arrays["values"], arrays["occupied"]
+        return table
+
+def make_table(backend, capacity, key_dtype=np.uint64, value_dtype=np.int64):
+    if backend == "dict":
+        return {}
+    if backend == "array":
+        return ArrayTable(capacity, key_dtype, value_dtype)
+    raise ValueError(f"unknown backend {backend!r}")
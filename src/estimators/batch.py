@@ -0,0 +1,37 @@
+import numpy as np
+
+# Helpers for the estimators' update_many(keys, values=None) batch ingest.
+# values=None means unit increments.
+
+def as_batch(keys, values=None):
+    keys = np.asarray(keys)
+    if values is not None:
+        values = np.broadcast_to(np.asarray(values), keys.shape)
+    return keys, values
+
+def aggregate(keys, values=None):
+    # sum the values of duplicate keys, only safe for linear sketches
+    if values is None:
+        return np.unique(keys, return_counts=True)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=values, minlength=len(unique))
+    if np.issubdtype(values.dtype, np.integer):
+        totals = totals.astype(np.int64)
+    return unique, totals
+
+def run_lengths(keys, values=None):
+    # collapse runs of the same consecutive key into a single update
+    if len(keys) == 0:
+        return keys, np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    if values is None:
+        return keys[starts], np.diff(np.append(starts, len(keys)))
+    return keys[starts], np.add.reduceat(values, starts)
+
+def update_each(update, keys, values=None):
+    if values is None:
+        for key in keys.tolist():
+            update(key, 1)
+    else:
+        for key, value in zip(keys.tolist(), values.tolist()):
+            update(key, value)
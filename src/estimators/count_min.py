@@ -1,24 +1,78 @@
+import random
 import numpy as np
-import mmh3
+from estimators.batch import as_batch, aggregate
+from estimators.serialization import to_bytes, from_bytes
 
 class CountMin:
-    def __init__(self, width, depth):
-        self.width = width
+    # Keys are hashed as uint64 integers with one multiply-add-shift hash per
+    # row, vectorized over whole batches of keys. With conservative=True a
+    # batch only raises each counter to the smallest value that keeps every
+    # key's estimate an overestimate.
+    # seed=None draws the hash functions from the global random module, so
+    # random.seed() before construction still makes a run reproducible.
+    # Sketches only merge with the same seed.
+    def __init__(self, width, depth, seed=None, conservative=False):
+        self.width = int(width)
         self.depth = depth
-        self.table = np.zeros((depth, width), dtype=np.int64)
-        self.seeds = np.random.randint(1, 100000, size=depth)
+        self.conservative = conservative
+        self.table = np.zeros((depth, self.width), dtype=np.int64)
+        rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+        self.multipliers = rng.integers(0, 2**64, size=depth, dtype=np.uint64) | np.uint64(1)
+        self.increments = rng.integers(0, 2**64, size=depth, dtype=np.uint64)
+        self.rows = np.arange(depth)[:, np.newaxis]
 
-    def _hash(self, index, i):
-        return mmh3.hash(index, self.seeds[i]) % self.width
+    def _hash(self, keys):
+        # (depth, len(keys)) column indexes, using the high 32 bits of
+        # a * key + b (mod 2^64) scaled into [0, width)
+        keys = np.asarray(keys).astype(np.uint64)
+        h = self.multipliers[:, np.newaxis] * keys + self.increments[:, np.newaxis]
+        return ((h >> np.uint64(32)) * np.uint64(self.width)) >> np.uint64(32)
+
+    def _add(self, keys, values):
+        columns = self._hash(keys)
+        if self.conservative:
+            estimates = self.table[self.rows, columns].min(axis=0) + values
+            np.maximum.at(self.table, (self.rows, columns), estimates)
+        else:
+            np.add.at(self.table, (self.rows, columns), values)
 
     def update(self, index, value):
-        for i in range(self.depth):
-            hash_index = self._hash(index, i)
-            self.table[i, hash_index] += value
+        self._add(np.array([index]), np.array([value]))
+
+    def update_many(self, keys, values=None):
+        # the sketch is linear, so duplicate keys in a batch can be summed
+        keys, values = aggregate(*as_batch(keys, values))
+        self._add(keys, values)
+
+    def merge(self, other):
+        # the sketch is linear, the sum of the tables is the sketch of both
+        # streams with the same error guarantee. Conservative sketches stay
+        # overestimates but are looser than one conservative sketch.
+        if (self.table.shape != other.table.shape or not np.array_equal(self.multipliers, other.multipliers)
+                or not np.array_equal(self.increments, other.increments)):
+            raise ValueError("can only merge sketches of the same width, depth and seed")
+        self.table += other.table
+        return self
 
     def query(self, index):
-        min_estimate = float('inf')
-        for i in range(self.depth):
-            hash_index = self._hash(index, i)
-            min_estimate = min(min_estimate, self.table[i, hash_index])
-        return min_estimate
+        return int(self.query_many(np.array([index]))[0])
+
+    def query_many(self, keys):
+        return self.table[self.rows, self._hash(keys)].min(axis=0)
+
+    def state(self):
+        return {"width": self.width, "depth": self.depth, "conservative": self.conservative}, {
+            "table": self.table, "multipliers": self.multipliers, "increments": self.increments}
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        sketch = cls(meta["width"], meta["depth"], conservative=meta["conservative"])
+        sketch.table, sketch.multipliers, sketch.increments = arrays["table"], arrays["multipliers"], arrays["increments"]
+        return sketch
+
+    def to_bytes(self):
+        return to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return from_bytes(data, cls)
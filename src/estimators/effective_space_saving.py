@@ -1,30 +1,185 @@
-from random import random
+import random
+import numpy as np
+from estimators.min_heap import IndexedMinHeap
+from estimators.batch import as_batch
+from estimators.queries import query_each
+from estimators.serialization import (to_bytes, from_bytes, prefixed, unprefixed,
+                                      generator_state, generator_from_state)
+
+class CandidateWindow:
+    # The candidates of EffectiveSpaceSaving: keys and values in
+    # preallocated arrays, a key -> slot index, and a running sum and argmax
+    # of the values, so a flush needs no scan to find them. Values only grow
+    # between flushes, so the max is kept up to date on every increment.
+    def __init__(self, capacity):
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.values = np.zeros(capacity, dtype=np.int64)
+        self.slot = {}
+        self.n = 0
+        self.total = 0
+        self.max_slot = 0
+
+    def __len__(self):
+        return self.n
+
+    def __contains__(self, key):
+        return key in self.slot
+
+    def get(self, key, default=None):
+        i = self.slot.get(key)
+        return default if i is None else int(self.values[i])
+
+    def items(self):
+        return zip(self.keys[:self.n].tolist(), self.values[:self.n].tolist())
+
+    def insert(self, key, value):
+        i = self.n
+        self.keys[i] = key
+        self.values[i] = value
+        self.slot[key] = i
+        self.n = i + 1
+        self.total += value
+        if i == 0 or value > self.values[self.max_slot]:
+            self.max_slot = i
+
+    def increment(self, key, value):
+        i = self.slot[key]
+        self.values[i] += value
+        self.total += value
+        if self.values[i] > self.values[self.max_slot]:
+            self.max_slot = i
+
+    def pop_max(self):
+        # (key, value) of the largest candidate, which leaves the window
+        i = self.max_slot
+        key, value = int(self.keys[i]), int(self.values[i])
+        self.values[i] = 0
+        self.total -= value
+        return key, value
+
+    def thin(self, rng, total=None):
+        # keep each candidate with probability value / total, all at once,
+        # total defaults to the current sum of the values
+        total = self.total if total is None else total
+        n = self.n
+        values = self.values[:n]
+        keep = np.flatnonzero(rng.random(n) * total < values)
+        n = len(keep)
+        self.keys[:n] = self.keys[keep]
+        self.values[:n] = values[keep]
+        self.n = n
+        self.slot = dict(zip(self.keys[:n].tolist(), range(n)))
+        self.total = int(self.values[:n].sum())
+        self.max_slot = int(np.argmax(self.values[:n])) if n else 0
+
+    def state(self):
+        return {"n": self.n, "total": self.total, "max_slot": self.max_slot}, {"keys": self.keys, "values": self.values}
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        window = cls.__new__(cls)
+        window.keys, window.values = arrays["keys"], arrays["values"]
+        window.n, window.total, window.max_slot = meta["n"], meta["total"], meta["max_slot"]
+        window.slot = dict(zip(window.keys[:window.n].tolist(), range(window.n)))
+        return window
+
 
 class EffectiveSpaceSaving:
-    def __init__(self, size, mem_percentage_candidates):
+    # Counters in an IndexedMinHeap, so the smallest is found in O(1) and
+    # replaced in O(log n). Once the counters are full, new keys go to a
+    # window of candidates. When the window is full the largest candidate
+    # takes the place of the smallest counter, adding that counter's value,
+    # and every other candidate survives with probability value / sum.
+    # seed=None seeds the thinning Generator from the global random module.
+    def __init__(self, size, mem_percentage_candidates, backend="dict", seed=None):
         self.size_counters = int(size * (1-mem_percentage_candidates))
         self.size_candidates = int(size * mem_percentage_candidates)
-        self.counters = {}
-        self.candidates = {}
- 
+        self.counters = IndexedMinHeap(self.size_counters, backend)
+        self.candidates = CandidateWindow(self.size_candidates)
+        self.rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+
     def update(self, index, value):
-        if index in self.counters:
-            self.counters[index] += value
-        elif len(self.counters) < self.size_counters:
-            self.counters[index] = value
+        counters = self.counters
+        if index in counters:
+            counters.increment(index, value)
+        elif len(counters) < self.size_counters:
+            counters.insert(index, value)
         else:
-            if index in self.candidates:
-                self.candidates[index] += value
-            elif len(self.candidates) < self.size_candidates:
-                self.candidates[index] = value
+            candidates = self.candidates
+            if index in candidates:
+                candidates.increment(index, value)
+            elif len(candidates) < self.size_candidates:
+                candidates.insert(index, value)
             else:
-                s = sum(self.candidates.values())
-                largest_window_flow = max(self.candidates, key=self.candidates.get)
-                smallest_counters_flow = min(self.counters, key=self.counters.get)
-                self.counters[largest_window_flow] = self.candidates[largest_window_flow] + self.counters[smallest_counters_flow]
-                del self.counters[smallest_counters_flow]
-                self.candidates = {k: v for k, v in self.candidates.items() if random() <= v/s}
+                self.flush()
+
+    def flush(self):
+        # the largest candidate leaves the window before it is thinned, the
+        # others still survive with probability value / sum over the whole
+        # window, the largest included
+        candidates = self.candidates
+        if not len(candidates):
+            return
+        total = candidates.total
+        key, value = candidates.pop_max()
+        _, smallest = self.counters.peek_min()
+        self.counters.replace_min(key, value + smallest)
+        candidates.thin(self.rng, total)
 
+    def update_many(self, keys, values=None):
+        keys, values = as_batch(keys, values)
+        keys = keys.tolist()
+        values = [1] * len(keys) if values is None else values.tolist()
+        counters, candidates = self.counters, self.candidates
+        size_counters, size_candidates = self.size_counters, self.size_candidates
+        for index, value in zip(keys, values):
+            if index in counters:
+                counters.increment(index, value)
+            elif len(counters) < size_counters:
+                counters.insert(index, value)
+            elif index in candidates:
+                candidates.increment(index, value)
+            elif len(candidates) < size_candidates:
+                candidates.insert(index, value)
+            else:
+                self.flush()
 
     def query(self, index):
-        return self.counters.get(index, 0)
\ No newline at end of file
+        return self.counters.get(index, 0)
+
+    def query_many(self, keys):
+        return query_each(self.query, keys)
+
+    # candidates are not estimates, only the counters are reported
+    def items(self):
+        return self.counters.items()
+
+    def top_k(self, k):
+        return self.counters.largest(k)
+
+    def heavy_hitters(self, threshold):
+        return self.counters.at_least(threshold)
+
+    def state(self):
+        counters_meta, counters_arrays = self.counters.state()
+        candidates_meta, candidates_arrays = self.candidates.state()
+        meta = {"size_counters": self.size_counters, "size_candidates": self.size_candidates,
+                "rng": generator_state(self.rng), "counters": counters_meta, "candidates": candidates_meta}
+        return meta, {**prefixed("counters", counters_arrays), **prefixed("candidates", candidates_arrays)}
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        estimator = cls.__new__(cls)
+        estimator.size_counters = meta["size_counters"]
+        estimator.size_candidates = meta["size_candidates"]
+        estimator.rng = generator_from_state(meta["rng"])
+        estimator.counters = IndexedMinHeap.from_state(meta["counters"], unprefixed("counters", arrays))
+        estimator.candidates = CandidateWindow.from_state(meta["candidates"], unprefixed("candidates", arrays))
+        return estimator
+
+    def to_bytes(self):
+        return to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return from_bytes(data, cls)
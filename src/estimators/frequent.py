@@ -1,19 +1,185 @@
+import numpy as np
+from estimators.stream_summary import StreamSummary
+from estimators.batch import as_batch, run_lengths, aggregate
+from estimators.queries import query_each
+from estimators.serialization import to_bytes, from_bytes, keys_array
+
 class Frequent:
+    # Misra-Gries with a lazy offset: a decrement of every counter is a
+    # single addition to self.offset, counters are stored in a StreamSummary
+    # as count + offset and the counters that reach 0 are dropped a whole
+    # minimum bucket at a time, each key at most once, so an update is O(1)
+    # amortized.
+    # Estimates are underestimates by at most N / (size + 1).
     def __init__(self, size):
-        self.decrements = 0
+        self.offset = 0
         self.size = size
-        self.counters = {}
+        self.counters = StreamSummary()
 
     def update(self, index, value):
-        if index in self.counters:
-            self.counters[index] += value
+        counters = self.counters
+        if index in counters:
+            counters.increment(index, value)
+        elif len(counters) < self.size:
+            counters.insert(index, value + self.offset)
         else:
-            if len(self.counters) >= self.size:
-                self.decrements += 1
-                keys_to_remove = [k for k, v in self.counters.items() if v - self.decrements <= 0]
-                self.counters = {k: v for k, v in self.counters.items() if k not in keys_to_remove}
-            if len(self.counters) < self.size:
-                self.counters[index] = value
+            # decrement every counter and the new key by the same amount,
+            # until either the key is used up or some counters reach 0
+            decrement = min(value, counters.min_count() - self.offset)
+            self.offset += decrement
+            self.remove_zeros()
+            if value > decrement:
+                counters.insert(index, value - decrement + self.offset)
+
+    def remove_zeros(self):
+        counters = self.counters
+        while len(counters) and counters.min_count() <= self.offset:
+            counters.pop_min_bucket()
+
+    def update_many(self, keys, values=None):
+        # runs of the same key are a single update of their summed value
+        update = self.update
+        for index, value in zip(*(a.tolist() for a in run_lengths(*as_batch(keys, values)))):
+            update(index, value)
+
+    def merge(self, other):
+        # Misra-Gries merge (Agarwal et al.): add the counts, then subtract
+        # the (size+1)-th largest count and drop the counters left at or
+        # below 0. Estimates remain underestimates, by at most
+        # (N1 + N2 - sum of counters) / (size + 1).
+        if other.size != self.size:
+            raise ValueError("can only merge summaries of the same size")
+        counts = {k: self.query(k) for k in self.counters.keys()}
+        for k in other.counters.keys():
+            counts[k] = counts.get(k, 0) + other.query(k)
+        cut = 0
+        if len(counts) > self.size:
+            cut = sorted(counts.values(), reverse=True)[self.size]
+        self.counters = StreamSummary()
+        self.offset = 0
+        # largest first, every insert then lands in the head bucket
+        for k, v in sorted(counts.items(), key=lambda item: -item[1]):
+            if v > cut:
+                self.counters.insert(k, v - cut)
+        return self
 
     def query(self, index):
-        return self.counters.get(index, 0) - self.decrements
\ No newline at end of file
+        count = self.counters.get(index)
+        return 0 if count is None else count - self.offset
+
+    def query_many(self, keys):
+        return query_each(self.query, keys)
+
+    def items(self):
+        offset = self.offset
+        return ((key, count - offset) for key, count in self.counters.items())
+
+    def top_k(self, k):
+        offset = self.offset
+        return [(key, count - offset) for key, count in self.counters.largest(k)]
+
+    def heavy_hitters(self, threshold):
+        offset = self.offset
+        return [(key, count - offset) for key, count in self.counters.at_least(threshold + offset)]
+
+    def state(self):
+        items = self.counters.ordered_items()
+        return {"size": self.size, "offset": self.offset}, {
+            "keys": keys_array(k for k, _ in items), "counts": np.array([c for _, c in items])}
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        estimator = cls(meta["size"])
+        estimator.offset = meta["offset"]
+        order = np.argsort(-arrays["counts"], kind="stable")
+        for key, count in zip(arrays["keys"][order].tolist(), arrays["counts"][order].tolist()):
+            estimator.counters.insert(key, count)
+        return estimator
+
+    def to_bytes(self):
+        return to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return from_bytes(data, cls)
+
+
+class BatchedFrequent:
+    # Misra-Gries over whole batches: the exact counts of a batch are added
+    # to the counters and, when more than size keys are left, the
+    # (size+1)-th largest count is subtracted from all of them, found with
+    # np.partition. This is the Misra-Gries merge of the batch's exact
+    # summary, so the same N / (size + 1) underestimate bound holds. Counters
+    # are sorted key and count arrays, queries are vectorized.
+    def __init__(self, size):
+        self.size = int(size)
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def _add(self, keys, counts):
+        keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]), minlength=len(keys)).astype(np.int64)
+        if len(keys) > self.size:
+            cut = np.partition(counts, len(counts) - self.size - 1)[len(counts) - self.size - 1]
+            counts -= cut
+            keep = counts > 0
+            keys, counts = keys[keep], counts[keep]
+        self.keys, self.counts = keys, counts
+
+    def update(self, index, value):
+        self.update_many(np.array([index], dtype=np.uint64), np.array([value]))
+
+    def update_many(self, keys, values=None):
+        keys, values = as_batch(keys, values)
+        if len(keys):
+            self._add(*aggregate(keys.astype(np.uint64), values))
+
+    def merge(self, other):
+        if other.size != self.size:
+            raise ValueError("can only merge summaries of the same size")
+        self._add(other.keys, other.counts)
+        return self
+
+    def query(self, index):
+        return int(self.query_many(np.array([index], dtype=np.uint64))[0])
+
+    def query_many(self, keys):
+        keys = np.asarray(keys).astype(np.uint64)
+        if len(self.keys) == 0:
+            return np.zeros(len(keys), dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[positions] == keys, self.counts[positions], 0)
+
+    def items(self):
+        return zip(self.keys.tolist(), self.counts.tolist())
+
+    def _ranked(self, slots):
+        slots = slots[np.argsort(-self.counts[slots], kind="stable")]
+        return list(zip(self.keys[slots].tolist(), self.counts[slots].tolist()))
+
+    def top_k(self, k):
+        n = len(self.counts)
+        if k <= 0:
+            return []
+        if k < n:
+            return self._ranked(np.argpartition(self.counts, n - k)[n - k:])
+        return self._ranked(np.arange(n))
+
+    def heavy_hitters(self, threshold):
+        return self._ranked(np.flatnonzero(self.counts >= threshold))
+
+    def state(self):
+        return {"size": self.size}, {"keys": self.keys, "counts": self.counts}
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        estimator = cls(meta["size"])
+        estimator.keys, estimator.counts = arrays["keys"], arrays["counts"]
+        return estimator
+
+    def to_bytes(self):
+        return to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return from_bytes(data, cls)
@@ -0,0 +1,165 @@
+from collections import Counter
+from time import perf_counter_ns
+from estimators.batch import as_batch, update_each
+from estimators.space_saving import SpaceSaving
+from estimators.rap import RandomAdmissionPolicy
+from estimators.mean_tail import MeanTail
+from estimators.frequent import Frequent
+from estimators.effective_space_saving import EffectiveSpaceSaving
+from estimators.count_min import CountMin
+
+# Optional hot-path statistics. instrument(estimator) swaps the estimator's
+# class for an instrumented subclass that counts, in estimator.stats, the
+# branch every update takes plus min lookups, evictions and promotions, and
+# with sample_every=n also times every n-th update per branch (the
+# "<branch>.ns" total over "<branch>.timed" updates). The estimator classes
+# themselves are untouched, so estimators that are not instrumented pay
+# nothing. Each branch function below only classifies an update, the update
+# itself is always the estimator's own. Only estimators that update one key
+# at a time are supported: BatchedFrequent and the windowed wrappers raise
+# TypeError.
+
+def rap_branch(self, update, key, value):
+    if key in self.counters:
+        update(self, key, value)
+        return "hit"
+    if len(self.counters) < self.size:
+        update(self, key, value)
+        return "fill"
+    self.stats["min_lookups"] += 1
+    update(self, key, value)
+    if key in self.counters:
+        self.stats["evictions"] += 1
+        return "admit"
+    return "reject"
+
+def mean_tail_branch(self, update, key, value):
+    if key in self.counters:
+        update(self, key, value)
+        return "counter_hit"
+    if key in self.tail_index:
+        self.stats["min_lookups"] += 1
+        update(self, key, value)
+        if key in self.counters:
+            self.stats["promotions_to_counters"] += 1
+            return "tail_promote"
+        return "tail_hit"
+    if len(self.counters) < self.counters_size:
+        update(self, key, value)
+        return "fill_counters"
+    if len(self.tail_index) < self.tail_size:
+        update(self, key, value)
+        return "fill_tail"
+    update(self, key, value)
+    if key in self.tail_index:
+        self.stats["promotions_to_tail"] += 1
+        self.stats["evictions"] += 1
+        return "admit_tail"
+    return "reject"
+
+def space_saving_branch(self, update, key, value):
+    if key in self.counters:
+        update(self, key, value)
+        return "hit"
+    if len(self.counters) < self.size:
+        update(self, key, value)
+        return "fill"
+    self.stats["min_lookups"] += 1
+    self.stats["evictions"] += 1
+    update(self, key, value)
+    return "evict"
+
+def frequent_branch(self, update, key, value):
+    if key in self.counters:
+        update(self, key, value)
+        return "hit"
+    if len(self.counters) < self.size:
+        update(self, key, value)
+        return "fill"
+    before = len(self.counters)
+    update(self, key, value)
+    self.stats["evictions"] += before + (key in self.counters) - len(self.counters)
+    return "decrement_insert" if key in self.counters else "decrement_drop"
+
+def effective_space_saving_branch(self, update, key, value):
+    if key in self.counters:
+        update(self, key, value)
+        return "hit"
+    if len(self.counters) < self.size_counters:
+        update(self, key, value)
+        return "fill"
+    if key in self.candidates:
+        update(self, key, value)
+        return "candidate_hit"
+    if len(self.candidates) < self.size_candidates:
+        update(self, key, value)
+        return "fill_candidates"
+    self.stats["min_lookups"] += 1
+    self.stats["evictions"] += 1
+    self.stats["promotions_to_counters"] += 1
+    update(self, key, value)
+    return "flush_candidates"
+
+def count_min_branch(self, update, key, value):
+    update(self, key, value)
+    return "update"
+
+BRANCHES = {
+    RandomAdmissionPolicy: rap_branch,
+    MeanTail: mean_tail_branch,
+    SpaceSaving: space_saving_branch,
+    Frequent: frequent_branch,
+    EffectiveSpaceSaving: effective_space_saving_branch,
+    CountMin: count_min_branch,
+}
+
+class Instrumented:
+    def update(self, key, value):
+        stats = self.stats
+        stats["updates"] += 1
+        if self.sample_every and stats["updates"] % self.sample_every == 0:
+            t0 = perf_counter_ns()
+            branch = self.branch(key, value)
+            stats[f"{branch}.ns"] += perf_counter_ns() - t0
+            stats[f"{branch}.timed"] += 1
+        else:
+            branch = self.branch(key, value)
+        stats[branch] += 1
+
+    def update_many(self, keys, values=None):
+        # one update at a time, so every update is classified
+        update_each(self.update, *as_batch(keys, values))
+
+_classes = {}
+
+def instrumented_class(cls):
+    if cls not in BRANCHES:
+        raise TypeError(f"cannot instrument {cls.__name__}, only {', '.join(c.__name__ for c in BRANCHES)}")
+    if cls not in _classes:
+        classify, update = BRANCHES[cls], cls.update
+
+        def branch(self, key, value):
+            return classify(self, update, key, value)
+
+        _classes[cls] = type(f"Instrumented{cls.__name__}", (Instrumented, cls), {"branch": branch})
+    return _classes[cls]
+
+def instrument(estimator, sample_every=0):
+    # returns the estimator itself, with a fresh estimator.stats
+    base = uninstrument(estimator).__class__
+    estimator.__class__ = instrumented_class(base)
+    estimator.stats = Counter()
+    estimator.sample_every = sample_every
+    return estimator
+
+def uninstrument(estimator):
+    if isinstance(estimator, Instrumented):
+        estimator.__class__ = estimator.__class__.__mro__[2]
+    return estimator
+
+def estimator_stats(estimator):
+    # the stats of an instrumented estimator as "stats.<name>" columns
+    stats = getattr(estimator, "stats", None)
+    if not isinstance(estimator, Instrumented) or stats is None:
+        return {}
+    return {f"stats.{name}": count for name, count in sorted(stats.items())}
@@ -1,60 +1,228 @@
-from random import random, randrange
+import heapq
+import random
+from itertools import islice
 import numpy as np
+from estimators.min_heap import IndexedMinHeap
+from estimators.array_table import ArrayTable, make_table
+from estimators.batch import as_batch
+from estimators.queries import query_each
+from estimators.serialization import to_bytes, from_bytes, prefixed, unprefixed, keys_array, rng_state, rng_from_state
 
 class MeanTail:
-    def __init__(self, size, mem_percentage_tail=0.1):
+    # seed=None seeds the estimator's own RNG from the global random module,
+    # so random.seed() before construction still makes a run reproducible.
+    # Tail keys are estimated as the tail average rounded to at least 1, or
+    # the plain average with rounded=False, for fractional (decayed) counts.
+    def __init__(self, size, mem_percentage_tail=0.1, backend="dict", seed=None, rounded=True):
         self.counters_size = int(size * (1 - mem_percentage_tail))
         self.tail_size = int(size * mem_percentage_tail * 2)
-        self.counters = {}
-        self.tail = []
+        self.backend = backend
+        self.rounded = rounded
+        self.rng = random.Random(random.getrandbits(64) if seed is None else seed)
+        self.clear()
+
+    def clear(self):
+        self.counters = IndexedMinHeap(self.counters_size, self.backend, value_dtype=np.float64)
+        # tail keys live in a slot array, with a key -> slot index for O(1)
+        # membership, random-slot overwrite and swap with the counters
+        if self.backend == "array":
+            self.tail = np.zeros(self.tail_size, dtype=np.uint64)
+        else:
+            self.tail = [None] * self.tail_size
+        self.tail_index = make_table(self.backend, self.tail_size, value_dtype=np.uint32)
         self.tail_total = 0
 
     def memory_usage(self):
+        # the bytes actually held with the array backend, else the model of
+        # 4-byte keys and counters
+        if self.backend == "array":
+            return self.counters.nbytes + self.tail.nbytes + self.tail_index.nbytes
         return (self.counters_size * 2 + self.tail_size) * 4
 
     def tail_average(self):
-        return self.tail_total / len(self.tail)
+        return self.tail_total / len(self.tail_index)
 
     def attempt_promote_to_counters(self, key, value):
-        min_counter_key = min(self.counters, key=self.counters.get)
-        min_counter = self.counters[min_counter_key]
+        min_counter_key, min_counter = self.counters.peek_min()
         tail_average = self.tail_average()
-        divisor = max(1, 1 + min_counter - tail_average)
+        # weighted, at most 1 whatever the value, the same as
+        # 1 / max(1, 1 + min - average) for unit updates
+        divisor = max(value, value + min_counter - tail_average)
         thresh = value / divisor
         # swap from tail to counters
-        if random() < thresh:
-            del self.counters[min_counter_key]
-            self.counters[key] = tail_average + value
-            self.tail.remove(key)
-            self.tail.append(min_counter_key)
+        if self.rng.random() < thresh:
+            self.counters.replace_min(key, tail_average + value)
+            slot = self.tail_index.pop(key)
+            self.tail[slot] = min_counter_key
+            self.tail_index[min_counter_key] = slot
             # self.tail_total += min_counter - tail_average
         else:
             self.tail_total += value
 
     def attempt_promote_to_tail(self, key, value):
         tail_average = self.tail_average()
-        thresh = value / (tail_average + 1)
-        if random() < thresh:
+        # weighted, 1 / (average + 1) for unit updates
+        thresh = value / (tail_average + value)
+        if self.rng.random() < thresh:
             self.tail_total += value
-            self.tail[randrange(len(self.tail))] = key
+            slot = self.rng.randrange(len(self.tail_index))
+            del self.tail_index[self.tail[slot]]
+            self.tail[slot] = key
+            self.tail_index[key] = slot
     
     def update(self, key, value):
         if key in self.counters:
-            self.counters[key] += value
-        elif key in self.tail:
+            self.counters.increment(key, value)
+        elif key in self.tail_index:
             self.attempt_promote_to_counters(key, value)
         elif len(self.counters) < self.counters_size:
-            self.counters[key] = value
-        elif len(self.tail) < self.tail_size:
+            self.counters.insert(key, value)
+        elif len(self.tail_index) < self.tail_size:
             self.tail_total += value
-            self.tail.append(key)
+            slot = len(self.tail_index)
+            self.tail[slot] = key
+            self.tail_index[key] = slot
         else:
             self.attempt_promote_to_tail(key, value)
 
+    def update_many(self, keys, values=None):
+        keys, values = as_batch(keys, values)
+        keys = keys.tolist()
+        values = [1] * len(keys) if values is None else values.tolist()
+        counters = self.counters
+        tail_index = self.tail_index
+        for key, value in zip(keys, values):
+            if key in counters:
+                counters.increment(key, value)
+            elif key in tail_index:
+                self.attempt_promote_to_counters(key, value)
+            else:
+                self.update(key, value)
+
+    def estimates(self):
+        # key -> estimate of every key in the counters or the tail
+        result = dict(self.counters.items())
+        if len(self.tail_index):
+            tail_average = self.tail_average()
+            for key in self.tail_index.keys():
+                result[key] = tail_average
+        return result
+
+    def merge(self, other):
+        # Estimates of the same key are added, a tail key counting as its
+        # tail's average. The counters_size largest go to the counters, the
+        # next tail_size largest to the tail, whose total becomes the sum of
+        # their estimates so the tail average stays their mean. A heuristic
+        # like RAP's merge, MeanTail has no worst-case bound to preserve.
+        if other.counters_size != self.counters_size or other.tail_size != self.tail_size:
+            raise ValueError("can only merge estimators of the same sizes")
+        estimates = self.estimates()
+        for key, estimate in other.estimates().items():
+            estimates[key] = estimates.get(key, 0) + estimate
+        ranked = heapq.nlargest(self.counters_size + self.tail_size, estimates.items(), key=lambda item: item[1])
+        self.clear()
+        for key, estimate in ranked[:self.counters_size]:
+            self.counters.insert(key, estimate)
+        for slot, (key, estimate) in enumerate(ranked[self.counters_size:]):
+            self.tail[slot] = key
+            self.tail_index[key] = slot
+            self.tail_total += estimate
+        return self
+
+    @property
+    def float_counts(self):
+        return not self.rounded
+
+    def scale(self, factor):
+        self.counters.scale(factor)
+        self.tail_total *= factor
+
     def query(self, key):
         estimate = self.counters.get(key, 0)
         if estimate != 0:
             return estimate
-        if key in self.tail:
+        if key in self.tail_index:
+            return self.tail_estimate()
+        return 0
+
+    def tail_estimate(self):
+        # what query() answers for every key of the tail
+        if self.rounded:
             return max(1, round(self.tail_average()))
-        return 0
\ No newline at end of file
+        return self.tail_average()
+
+    def query_many(self, keys):
+        return query_each(self.query, keys)
+
+    def items(self):
+        yield from self.counters.items()
+        if len(self.tail_index):
+            estimate = self.tail_estimate()
+            for key in self.tail_index.keys():
+                yield key, estimate
+
+    def top_k(self, k):
+        # the counters' k largest, then tail keys, which all share one
+        # estimate, wherever it ranks among them
+        top = self.counters.largest(k)
+        if len(self.tail_index) and k > 0 and (len(top) < k or top[-1][1] < self.tail_estimate()):
+            estimate = self.tail_estimate()
+            top += [(key, estimate) for key in islice(self.tail_index.keys(), k)]
+            top = sorted(top, key=lambda item: -item[1])[:k]
+        return top
+
+    def heavy_hitters(self, threshold):
+        hitters = self.counters.at_least(threshold)
+        if len(self.tail_index) and self.tail_estimate() >= threshold:
+            estimate = self.tail_estimate()
+            hitters += [(key, estimate) for key in self.tail_index.keys()]
+            hitters.sort(key=lambda item: -item[1])
+        return hitters
+
+    def state(self):
+        counters_meta, counters_arrays = self.counters.state()
+        meta = {
+            "counters_size": self.counters_size,
+            "tail_size": self.tail_size,
+            "backend": self.backend,
+            "rounded": self.rounded,
+            "tail_total": float(self.tail_total),
+            "rng": rng_state(self.rng),
+            "counters": counters_meta,
+        }
+        arrays = prefixed("counters", counters_arrays)
+        if self.backend == "array":
+            tail_index_meta, tail_index_arrays = self.tail_index.state()
+            meta["tail_index"] = tail_index_meta
+            arrays.update(prefixed("tail_index", tail_index_arrays))
+            arrays["tail"] = self.tail
+        else:
+            # the tail fills its slots in order, only the first ones can be empty
+            arrays["tail"] = keys_array(self.tail[:len(self.tail_index)])
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        estimator = cls.__new__(cls)
+        estimator.counters_size = meta["counters_size"]
+        estimator.tail_size = meta["tail_size"]
+        estimator.backend = meta["backend"]
+        estimator.rounded = meta["rounded"]
+        estimator.tail_total = meta["tail_total"]
+        estimator.rng = rng_from_state(meta["rng"])
+        estimator.counters = IndexedMinHeap.from_state(meta["counters"], unprefixed("counters", arrays))
+        if estimator.backend == "array":
+            estimator.tail = arrays["tail"]
+            estimator.tail_index = ArrayTable.from_state(meta["tail_index"], unprefixed("tail_index", arrays))
+        else:
+            tail = arrays["tail"].tolist()
+            estimator.tail = tail + [None] * (estimator.tail_size - len(tail))
+            estimator.tail_index = {key: slot for slot, key in enumerate(tail)}
+        return estimator
+
+    def to_bytes(self):
+        return to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return from_bytes(data, cls)
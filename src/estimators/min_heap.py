@@ -0,0 +1,245 @@
+import numpy as np
+from estimators.array_table import ArrayTable
+from estimators.serialization import prefixed, unprefixed, keys_array
+
+class IndexedMinHeap:
+    # Binary min-heap of key -> value with a key -> position index, so that
+    # lookup is O(1) and finding the minimum, replacing it and changing any
+    # key's value are O(log n). Ties are broken by insertion order, matching
+    # min() over an insertion-ordered dict.
+    # backend="array" keeps the heap in preallocated NumPy arrays and the
+    # index in an ArrayTable, which needs a capacity and integer keys. Its
+    # insertion sequence numbers are uint32, renumbered in order whenever
+    # they run out.
+    def __init__(self, capacity=None, backend="dict", key_dtype=np.uint64, value_dtype=np.int64):
+        if backend == "dict":
+            self.heap_keys = []
+            self.heap_values = []
+            self.heap_seqs = []
+            self.position = {}
+            self.seq_limit = None
+        elif backend == "array":
+            capacity = int(capacity)
+            self.heap_keys = np.zeros(capacity, dtype=key_dtype)
+            self.heap_values = np.zeros(capacity, dtype=value_dtype)
+            self.heap_seqs = np.zeros(capacity, dtype=np.uint32)
+            self.position = ArrayTable(capacity, key_dtype, np.uint32)
+            self.seq_limit = 1 << 32
+        else:
+            raise ValueError(f"unknown backend {backend!r}")
+        self.backend = backend
+        self.n = 0
+        self.next_seq = 0
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def nbytes(self):
+        if self.backend == "dict":
+            return None
+        return self.heap_keys.nbytes + self.heap_values.nbytes + self.heap_seqs.nbytes + self.position.nbytes
+
+    def __contains__(self, key):
+        return key in self.position
+
+    def __getitem__(self, key):
+        return self.heap_values[self.position[key]]
+
+    def get(self, key, default=None):
+        i = self.position.get(key)
+        if i is None:
+            return default
+        return self.heap_values[i]
+
+    def keys(self):
+        return self.position.keys()
+
+    def values(self):
+        if self.backend == "array":
+            return iter(self.heap_values[:self.n].tolist())
+        return iter(self.heap_values[:self.n])
+
+    def items(self):
+        # plain Python keys and values with either backend
+        if self.backend == "array":
+            return zip(self.heap_keys[:self.n].tolist(), self.heap_values[:self.n].tolist())
+        return zip(self.heap_keys[:self.n], self.heap_values[:self.n])
+
+    @property
+    def float_values(self):
+        # whether values are kept as floats, always with the dict backend
+        return self.backend == "dict" or self.heap_values.dtype.kind == "f"
+
+    def scale(self, factor):
+        # multiply every value by factor > 0, which keeps the heap order
+        if not self.float_values:
+            raise ValueError("scale needs float values, build the heap with a float value_dtype")
+        n = self.n
+        if self.backend == "array":
+            self.heap_values[:n] *= factor
+        else:
+            self.heap_values[:n] = [value * factor for value in self.heap_values[:n]]
+
+    def largest(self, k):
+        # the k largest (key, value), largest first, in O(n + k log k): an
+        # O(n) partition of the values in NumPy (the dict backend copies
+        # them into an array first) and a sort of the k selected only. A
+        # min-heap has no faster way to its largest values.
+        values = np.asarray(self.heap_values[:self.n])
+        if k <= 0:
+            return []
+        if k < len(values):
+            return self._ranked(values, np.argpartition(values, len(values) - k)[len(values) - k:])
+        return self._ranked(values, np.arange(len(values)))
+
+    def at_least(self, value):
+        # every (key, value) with at least the given value, largest first
+        values = np.asarray(self.heap_values[:self.n])
+        return self._ranked(values, np.flatnonzero(values >= value))
+
+    def _ranked(self, values, slots):
+        slots = slots[np.argsort(-values[slots], kind="stable")]
+        if self.backend == "array":
+            return list(zip(self.heap_keys[slots].tolist(), values[slots].tolist()))
+        keys = self.heap_keys
+        return [(keys[i], self.heap_values[i]) for i in slots.tolist()]
+
+    def state(self):
+        meta = {"backend": self.backend, "n": self.n, "next_seq": self.next_seq}
+        if self.backend == "array":
+            position_meta, position_arrays = self.position.state()
+            meta["position"] = position_meta
+            arrays = {"keys": self.heap_keys, "values": self.heap_values, "seqs": self.heap_seqs}
+            arrays.update(prefixed("position", position_arrays))
+            return meta, arrays
+        n = self.n
+        return meta, {
+            "keys": keys_array(self.heap_keys[:n]),
+            "values": np.array(self.heap_values[:n]),
+            "seqs": np.array(self.heap_seqs[:n], dtype=np.uint64),
+        }
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        heap = cls.__new__(cls)
+        heap.backend = meta["backend"]
+        heap.n = meta["n"]
+        heap.next_seq = meta["next_seq"]
+        if heap.backend == "array":
+            heap.heap_keys, heap.heap_values, heap.heap_seqs = arrays["keys"], arrays["values"], arrays["seqs"]
+            heap.seq_limit = int(np.iinfo(heap.heap_seqs.dtype).max) + 1
+            heap.position = ArrayTable.from_state(meta["position"], unprefixed("position", arrays))
+        else:
+            heap.heap_keys = arrays["keys"].tolist()
+            heap.heap_values = arrays["values"].tolist()
+            heap.heap_seqs = arrays["seqs"].tolist()
+            heap.seq_limit = None
+            heap.position = {key: i for i, key in enumerate(heap.heap_keys)}
+        return heap
+
+    def peek_min(self):
+        return self.heap_keys[0], self.heap_values[0]
+
+    def _sift_up(self, i):
+        keys, values, seqs, position = self.heap_keys, self.heap_values, self.heap_seqs, self.position
+        key, value, seq = keys[i], values[i], seqs[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            parent_value = values[parent]
+            if parent_value < value or (parent_value == value and seqs[parent] < seq):
+                break
+            keys[i], values[i], seqs[i] = keys[parent], parent_value, seqs[parent]
+            position[keys[i]] = i
+            i = parent
+        keys[i], values[i], seqs[i] = key, value, seq
+        position[key] = i
+
+    def _sift_down(self, i):
+        keys, values, seqs, position = self.heap_keys, self.heap_values, self.heap_seqs, self.position
+        n = self.n
+        key, value, seq = keys[i], values[i], seqs[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            right = child + 1
+            if right < n and (values[right] < values[child] or (values[right] == values[child] and seqs[right] < seqs[child])):
+                child = right
+            child_value = values[child]
+            if value < child_value or (value == child_value and seq < seqs[child]):
+                break
+            keys[i], values[i], seqs[i] = keys[child], child_value, seqs[child]
+            position[keys[i]] = i
+            i = child
+        keys[i], values[i], seqs[i] = key, value, seq
+        position[key] = i
+
+    def insert(self, key, value):
+        n = self.n
+        if n == len(self.heap_keys):
+            self.heap_keys.append(key)
+            self.heap_values.append(value)
+            self.heap_seqs.append(self.next_seq)
+        else:
+            self.heap_keys[n] = key
+            self.heap_values[n] = value
+            self.heap_seqs[n] = self.next_seq
+        self.n = n + 1
+        self.next_seq += 1
+        if self.next_seq == self.seq_limit:
+            self._renumber()
+        self._sift_up(n)
+
+    def set(self, key, value):
+        i = self.position.get(key)
+        if i is None:
+            self.insert(key, value)
+            return
+        old_value = self.heap_values[i]
+        self.heap_values[i] = value
+        if value < old_value:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+    def increment(self, key, value):
+        i = self.position[key]
+        self.heap_values[i] += value
+        if value < 0:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+    def replace_min(self, key, value):
+        # evict the minimum and insert key as a fresh entry in a single sift
+        del self.position[self.heap_keys[0]]
+        self.heap_keys[0] = key
+        self.heap_values[0] = value
+        self.heap_seqs[0] = self.next_seq
+        self.next_seq += 1
+        if self.next_seq == self.seq_limit:
+            self._renumber()
+        self._sift_down(0)
+
+    def _renumber(self):
+        # the same order with sequence numbers 0..n-1, ties break as before
+        n = self.n
+        self.heap_seqs[np.argsort(self.heap_seqs[:n], kind="stable")] = np.arange(n, dtype=self.heap_seqs.dtype)
+        self.next_seq = n
+
+    def remove(self, key):
+        i = self.position.pop(key)
+        self.n -= 1
+        last = self.n
+        if i == last:
+            return
+        last_key, last_value, last_seq = self.heap_keys[last], self.heap_values[last], self.heap_seqs[last]
+        self.heap_keys[i], self.heap_values[i], self.heap_seqs[i] = last_key, last_value, last_seq
+        self._sift_up(i)
+        self._sift_down(self.position[last_key])
+
+    def pop_min(self):
+        key, value = self.peek_min()
+        self.remove(key)
+        return key, value
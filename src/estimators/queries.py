@@ -0,0 +1,14 @@
+import numpy as np
+
+# Helpers for the estimators' read path besides query(key):
+#   items()                  every tracked (key, estimate), in no order,
+#   top_k(k)                 the k largest (key, estimate), largest first,
+#   heavy_hitters(threshold) every (key, estimate) with estimate >= threshold,
+#                            largest first,
+#   query_many(keys)         query() of every key, as a NumPy array.
+# top_k and heavy_hitters walk the estimators' own ordering (StreamSummary
+# buckets, or a partition of the heap values) rather than sorting every key.
+
+def query_each(query, keys):
+    # the dtype follows the estimates, integer or float counts
+    return np.array([query(k) for k in np.asarray(keys).tolist()])
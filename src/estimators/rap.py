@@ -1,26 +1,109 @@
-from random import random
+import heapq
+import random
+from estimators.min_heap import IndexedMinHeap
+from estimators.batch import as_batch
+from estimators.queries import query_each
+from estimators.serialization import to_bytes, from_bytes, prefixed, unprefixed, rng_state, rng_from_state
 
 class RandomAdmissionPolicy:
-    def __init__(self, size):
+    # seed=None seeds the estimator's own RNG from the global random module,
+    # so random.seed() before construction still makes a run reproducible
+    def __init__(self, size, backend="dict", seed=None):
         self.size = size
-        self.counters = {}
-  
+        self.counters = IndexedMinHeap(size, backend)
+        self.rng = random.Random(random.getrandbits(64) if seed is None else seed)
+
     def memory_usage(self):
+      # the bytes actually held with the array backend, else the model of a
+      # 4-byte key and a 4-byte counter per entry
+      if self.counters.backend == "array":
+        return self.counters.nbytes
       return self.size * 2 * 4
 
     def update(self, index, value):
         if index in self.counters:
-            self.counters[index] += value
+            self.counters.increment(index, value)
         else:
           if len(self.counters) < self.size:
-            self.counters[index] = value
+            self.counters.insert(index, value)
           else:
-            min_counter_index = min(self.counters, key=self.counters.get)
-            min_counter = self.counters[min_counter_index]
-            thresh = 1 / (min_counter + 1)
-            if random() < thresh:
-              del self.counters[min_counter_index]
-              self.counters[index] = min_counter + value
+            # weighted admission, value / (min + value), 1 / (min + 1) for
+            # unit updates
+            _, min_counter = self.counters.peek_min()
+            thresh = value / (min_counter + value)
+            if self.rng.random() < thresh:
+              self.counters.replace_min(index, min_counter + value)
+
+    def update_many(self, keys, values=None):
+        keys, values = as_batch(keys, values)
+        keys = keys.tolist()
+        values = [1] * len(keys) if values is None else values.tolist()
+        counters = self.counters
+        size = self.size
+        rand = self.rng.random
+        for index, value in zip(keys, values):
+            if index in counters:
+                counters.increment(index, value)
+            elif len(counters) < size:
+                counters.insert(index, value)
+            else:
+                _, min_counter = counters.peek_min()
+                if rand() < value / (min_counter + value):
+                    counters.replace_min(index, min_counter + value)
+
+    def merge(self, other):
+        # Counts of the same key are added and the size largest kept. This is
+        # a heuristic, the estimate of a kept key is the sum of the shards'
+        # estimates, RAP offers no worst-case bound to preserve.
+        if other.size != self.size:
+            raise ValueError("can only merge estimators of the same size")
+        counts = dict(self.counters.items())
+        for key, count in other.counters.items():
+            counts[key] = counts.get(key, 0) + count
+        self.counters = IndexedMinHeap(self.size, self.counters.backend)
+        for key, count in heapq.nlargest(self.size, counts.items(), key=lambda item: item[1]):
+            self.counters.insert(key, count)
+        return self
+
+    @property
+    def float_counts(self):
+        # only the dict backend keeps fractional counts, the array one is int64
+        return self.counters.float_values
+
+    def scale(self, factor):
+        # multiply every count by factor, counts must be floats
+        self.counters.scale(factor)
 
     def query(self, index):
-        return self.counters.get(index, 0)
\ No newline at end of file
+        return self.counters.get(index, 0)
+
+    def query_many(self, keys):
+        return query_each(self.query, keys)
+
+    def items(self):
+        return self.counters.items()
+
+    def top_k(self, k):
+        return self.counters.largest(k)
+
+    def heavy_hitters(self, threshold):
+        return self.counters.at_least(threshold)
+
+    def state(self):
+        counters_meta, counters_arrays = self.counters.state()
+        return {"size": self.size, "rng": rng_state(self.rng), "counters": counters_meta}, prefixed("counters", counters_arrays)
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        estimator = cls.__new__(cls)
+        estimator.size = meta["size"]
+        estimator.rng = rng_from_state(meta["rng"])
+        estimator.counters = IndexedMinHeap.from_state(meta["counters"], unprefixed("counters", arrays))
+        return estimator
+
+    def to_bytes(self):
+        return to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return from_bytes(data, cls)
@@ -0,0 +1,131 @@
+import os
+import json
+import mmap
+import random
+import struct
+import numpy as np
+
+# Versioned binary format of estimator state:
+#   MAGIC, uint32 version, uint32 header length, JSON header, then every
+#   array as a raw buffer aligned to ALIGN bytes.
+# The header holds the estimator type, its scalar state ("meta", including
+# the RNG state) and the dtype, shape and offset of every array. Estimators
+# provide state() -> (meta, arrays) and from_state(meta, arrays). from_bytes
+# copies the arrays out of the buffer, restore() maps a snapshot file
+# copy-on-write so array-backed state is used in place without reading it.
+# VERSION changes whenever a state layout does, older data is rejected.
+
+MAGIC = b"MTSKETCH"
+VERSION = 2
+ALIGN = 64
+PREAMBLE = struct.Struct("<8sII")
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+def pack(kind, meta, arrays):
+    layout = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        layout.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"type": kind, "meta": meta, "arrays": layout}).encode()
+    start = _aligned(PREAMBLE.size + len(header))
+    data = bytearray(start + offset)
+    data[:PREAMBLE.size] = PREAMBLE.pack(MAGIC, VERSION, len(header))
+    data[PREAMBLE.size:PREAMBLE.size + len(header)] = header
+    for entry, array in zip(layout, arrays.values()):
+        raw = np.ascontiguousarray(array).tobytes()
+        data[start + entry["offset"]:start + entry["offset"] + len(raw)] = raw
+    return bytes(data)
+
+def unpack(buffer):
+    # (type, meta, arrays), the arrays are views into buffer
+    magic, version, header_length = PREAMBLE.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError("not a serialized estimator")
+    if version > VERSION:
+        raise ValueError(f"estimator format version {version} is newer than {VERSION}")
+    if version < VERSION:
+        raise ValueError(f"estimator format version {version} is no longer supported, {VERSION} is")
+    header = json.loads(bytes(buffer[PREAMBLE.size:PREAMBLE.size + header_length]))
+    start = _aligned(PREAMBLE.size + header_length)
+    arrays = {}
+    for entry in header["arrays"]:
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=start + entry["offset"])
+        arrays[entry["name"]] = array.reshape(entry["shape"])
+    return header["type"], header["meta"], arrays
+
+def _types():
+    from estimators.space_saving import SpaceSaving
+    from estimators.rap import RandomAdmissionPolicy
+    from estimators.mean_tail import MeanTail
+    from estimators.frequent import Frequent, BatchedFrequent
+    from estimators.effective_space_saving import EffectiveSpaceSaving
+    from estimators.count_min import CountMin
+    classes = [SpaceSaving, RandomAdmissionPolicy, MeanTail, Frequent, BatchedFrequent, EffectiveSpaceSaving, CountMin]
+    return {cls.__name__: cls for cls in classes}
+
+def _load(buffer, cls=None, copy=True):
+    kind, meta, arrays = unpack(buffer)
+    if cls is None:
+        cls = _types()[kind]
+    elif cls.__name__ != kind:
+        raise ValueError(f"serialized {kind}, not {cls.__name__}")
+    if copy:
+        arrays = {name: array.copy() for name, array in arrays.items()}
+    return cls.from_state(meta, arrays)
+
+def to_bytes(estimator):
+    meta, arrays = estimator.state()
+    return pack(type(estimator).__name__, meta, arrays)
+
+def from_bytes(data, cls=None):
+    return _load(data, cls)
+
+def snapshot(estimator, path):
+    # written to a private file first, a snapshot is never seen half written
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(to_bytes(estimator))
+    os.replace(tmp_path, path)
+
+def restore(path, cls=None):
+    # arrays stay views of the copy-on-write mapping, writes are private
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    return _load(mapping, cls, copy=False)
+
+# helpers for nested state, e.g. a heap inside an estimator
+
+def prefixed(prefix, arrays):
+    return {f"{prefix}.{name}": array for name, array in arrays.items()}
+
+def unprefixed(prefix, arrays):
+    start = len(prefix) + 1
+    return {name[start:]: array for name, array in arrays.items() if name.startswith(prefix + ".")}
+
+def keys_array(keys):
+    return np.fromiter(keys, dtype=np.uint64)
+
+def rng_state(rng):
+    version, internal, gauss_next = rng.getstate()
+    return [version, list(internal), gauss_next]
+
+def rng_from_state(state):
+    rng = random.Random()
+    version, internal, gauss_next = state
+    rng.setstate((version, tuple(internal), gauss_next))
+    return rng
+
+def generator_state(rng):
+    # a NumPy Generator's bit generator state is a JSON-able dict
+    return rng.bit_generator.state
+
+def generator_from_state(state):
+    rng = np.random.Generator(getattr(np.random, state["bit_generator"])())
+    rng.bit_generator.state = state
+    return rng
@@ -1,18 +1,91 @@
+import heapq
+import numpy as np
+from estimators.stream_summary import StreamSummary
+from estimators.batch import as_batch, run_lengths
+from estimators.queries import query_each
+from estimators.serialization import to_bytes, from_bytes, keys_array
+
 class SpaceSaving:
     def __init__(self, size):
         self.size = size
-        self.counters = {}
+        self.counters = StreamSummary()
 
     def update(self, index, value):
-        if index in self.counters:
-            self.counters[index] += value
+        counters = self.counters
+        if index in counters:
+            counters.increment(index, value)
         else:
-            if len(self.counters) >= self.size:
-                index_smallest = min(self.counters, key=self.counters.get)
-                self.counters[index] = self.counters[index_smallest] + value
-                del self.counters[index_smallest]
+            if len(counters) >= self.size:
+                _, count_smallest = counters.pop_min()
+                counters.insert(index, count_smallest + value)
+            else:
+                counters.insert(index, value)
+
+    def update_many(self, keys, values=None):
+        # consecutive updates of the same key are equivalent to a single
+        # update with the summed value, any other reordering is not
+        keys, values = run_lengths(*as_batch(keys, values))
+        counters = self.counters
+        size = self.size
+        for index, value in zip(keys.tolist(), values.tolist()):
+            if index in counters:
+                counters.increment(index, value)
+            elif len(counters) >= size:
+                _, count_smallest = counters.pop_min()
+                counters.insert(index, count_smallest + value)
             else:
-                self.counters[index] = value
+                counters.insert(index, value)
 
     def query(self, index):
-        return self.counters.get(index, 0)
\ No newline at end of file
+        return self.counters.get(index, 0)
+
+    def query_many(self, keys):
+        return query_each(self.query, keys)
+
+    def items(self):
+        return self.counters.items()
+
+    def top_k(self, k):
+        return self.counters.largest(k)
+
+    def heavy_hitters(self, threshold):
+        return self.counters.at_least(threshold)
+
+    def missing_count(self):
+        # upper bound of the count of a key that is not in the summary
+        return self.counters.min_count() if len(self.counters) >= self.size else 0
+
+    def merge(self, other):
+        # Mergeable summaries (Agarwal et al.): a key missing from one summary
+        # is counted as that summary's missing_count, then the size largest
+        # counters are kept. Estimates remain overestimates, by at most
+        # (N1 + N2) / size for streams of N1 and N2 packets.
+        if other.size != self.size:
+            raise ValueError("can only merge summaries of the same size")
+        self_missing, other_missing = self.missing_count(), other.missing_count()
+        counts = {key: count + other.counters.get(key, other_missing) for key, count in self.counters.items()}
+        for key, count in other.counters.items():
+            if key not in counts:
+                counts[key] = count + self_missing
+        self.counters = StreamSummary()
+        for key, count in heapq.nlargest(self.size, counts.items(), key=lambda item: item[1]):
+            self.counters.insert(key, count)
+        return self
+
+    def state(self):
+        items = self.counters.ordered_items()
+        return {"size": self.size}, {"keys": keys_array(k for k, _ in items), "counts": np.array([c for _, c in items])}
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        estimator = cls(meta["size"])
+        for key, count in zip(arrays["keys"].tolist(), arrays["counts"].tolist()):
+            estimator.counters.insert(key, count)
+        return estimator
+
+    def to_bytes(self):
+        return to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return from_bytes(data, cls)
@@ -0,0 +1,191 @@
+from collections import deque
+from itertools import islice
+
+
+class Bucket:
+    __slots__ = ("count", "keys", "order", "prev", "next")
+
+    def __init__(self, count):
+        self.count = count
+        self.keys = {}
+        # (seq, key) pairs sorted by insertion sequence, built lazily on the
+        # first eviction from this bucket
+        self.order = None
+        self.prev = None
+        self.next = None
+
+
+class StreamSummary:
+    # Stream-Summary structure (Metwally et al.): a doubly linked list of
+    # count buckets in increasing order, each holding the keys with that
+    # count. Unit increments and min-eviction are O(1) (amortized).
+    # Ties within the minimum bucket are broken by insertion order, so that
+    # eviction picks the same key as min() over an insertion-ordered dict.
+    def __init__(self):
+        self.head = None
+        self.tail = None
+        self.buckets = {}
+        self.key_bucket = {}
+        self.seq = {}
+        self.next_seq = 0
+
+    def __len__(self):
+        return len(self.key_bucket)
+
+    def ordered_items(self):
+        # (key, count) in insertion order, inserting them again rebuilds an
+        # equivalent summary
+        order = sorted(self.seq.items(), key=lambda item: item[1])
+        return [(key, self.key_bucket[key].count) for key, _ in order]
+
+    # pickled as its items, the bucket list is too deep to pickle recursively
+    def __getstate__(self):
+        return self.ordered_items()
+
+    def __setstate__(self, items):
+        self.__init__()
+        for key, count in items:
+            self.insert(key, count)
+
+    def __contains__(self, key):
+        return key in self.key_bucket
+
+    def __getitem__(self, key):
+        return self.key_bucket[key].count
+
+    def get(self, key, default=None):
+        bucket = self.key_bucket.get(key)
+        if bucket is None:
+            return default
+        return bucket.count
+
+    def keys(self):
+        return self.key_bucket.keys()
+
+    def items(self):
+        for key, bucket in self.key_bucket.items():
+            yield key, bucket.count
+
+    def largest(self, k):
+        # the k largest (key, count), largest first, walking down from the
+        # tail bucket: O(k), every bucket holds at least one key
+        result = []
+        bucket = self.tail
+        while bucket is not None and len(result) < k:
+            result.extend((key, bucket.count) for key in islice(bucket.keys, k - len(result)))
+            bucket = bucket.prev
+        return result
+
+    def at_least(self, count):
+        # every (key, count) with at least the given count, largest first
+        result = []
+        bucket = self.tail
+        while bucket is not None and bucket.count >= count:
+            result.extend((key, bucket.count) for key in bucket.keys)
+            bucket = bucket.prev
+        return result
+
+    def min_count(self):
+        return self.head.count
+
+    def _link_after(self, bucket, prev):
+        # insert bucket after prev (or at the head if prev is None)
+        nxt = self.head if prev is None else prev.next
+        bucket.prev = prev
+        bucket.next = nxt
+        if prev is None:
+            self.head = bucket
+        else:
+            prev.next = bucket
+        if nxt is None:
+            self.tail = bucket
+        else:
+            nxt.prev = bucket
+        self.buckets[bucket.count] = bucket
+
+    def _unlink(self, bucket):
+        if bucket.prev is None:
+            self.head = bucket.next
+        else:
+            bucket.prev.next = bucket.next
+        if bucket.next is None:
+            self.tail = bucket.prev
+        else:
+            bucket.next.prev = bucket.prev
+        del self.buckets[bucket.count]
+
+    def _bucket_for(self, count, start):
+        # find or create the bucket for count, searching forward from start
+        bucket = self.buckets.get(count)
+        if bucket is not None:
+            return bucket
+        prev = start
+        nxt = self.head if prev is None else prev.next
+        while nxt is not None and nxt.count < count:
+            prev = nxt
+            nxt = nxt.next
+        if prev is not None and prev.count > count:
+            # count is below start, restart from the head
+            return self._bucket_for(count, None)
+        bucket = Bucket(count)
+        self._link_after(bucket, prev)
+        return bucket
+
+    def _detach(self, key):
+        bucket = self.key_bucket[key]
+        del bucket.keys[key]
+        if not bucket.keys:
+            self._unlink(bucket)
+            return bucket.prev
+        return bucket
+
+    def insert(self, key, count):
+        bucket = self._bucket_for(count, None)
+        seq = self.next_seq
+        self.next_seq += 1
+        self.seq[key] = seq
+        bucket.keys[key] = None
+        if bucket.order is not None:
+            bucket.order.append((seq, key))
+        self.key_bucket[key] = bucket
+
+    def increment(self, key, value):
+        count = self.key_bucket[key].count + value
+        bucket = self._bucket_for(count, self._detach(key))
+        bucket.keys[key] = None
+        # the key keeps its old sequence number, which may not be the largest
+        bucket.order = None
+        self.key_bucket[key] = bucket
+
+    def remove(self, key):
+        self._detach(key)
+        del self.key_bucket[key]
+        del self.seq[key]
+
+    def peek_min(self):
+        bucket = self.head
+        if bucket.order is None:
+            seq = self.seq
+            bucket.order = deque(sorted((seq[k], k) for k in bucket.keys))
+        order = bucket.order
+        while True:
+            s, key = order[0]
+            if key in bucket.keys and self.seq[key] == s:
+                return key, bucket.count
+            order.popleft()
+
+    def pop_min(self):
+        key, count = self.peek_min()
+        self.head.order.popleft()
+        self.remove(key)
+        return key, count
+
+    def pop_min_bucket(self):
+        # remove every key with the minimum count at once, (keys, count)
+        bucket = self.head
+        self._unlink(bucket)
+        key_bucket, seq = self.key_bucket, self.seq
+        for key in bucket.keys:
+            del key_bucket[key]
+            del seq[key]
+        return list(bucket.keys), bucket.count
@@ -0,0 +1,150 @@
+import math
+import heapq
+import numpy as np
+from estimators.batch import as_batch
+from estimators.queries import query_each
+
+# Windowed counting on top of the estimators, for "which keys are heavy in
+# the last window" rather than since the start of the stream. Time is the
+# timestamp given to update(key, value, timestamp), or the number of updates
+# so far without one, and must not go backwards (late updates count as now).
+#   JumpingWindow: the window is cut into panes, each counted by its own
+#     sketch. When a pane expires its sketch is replaced by a fresh one, so
+#     queries cover between window - window / panes and window.
+#   Decayed: exponential decay by forward decay (Cormode et al.). An update
+#     at time t adds value * 2**((t - landmark) / half_life) to the wrapped
+#     estimator and queries divide by the same factor at the latest time.
+#     Once that factor reaches RESCALE, every count is multiplied down with
+#     the estimator's scale(factor) and the landmark moved to the latest
+#     time, an O(size) pass at most once per half life. The wrapped
+#     estimator must keep float counts (float_counts): RAP with the dict
+#     backend, or MeanTail with rounded=False.
+# On top of the sketch update itself, JumpingWindow costs amortized O(1) per
+# update. Decayed adds one O(size) rescale per half life, O(size / half_life)
+# amortized when time counts updates, so O(1) only for half_life >= size.
+
+RESCALE = 2.0
+
+class JumpingWindow:
+    def __init__(self, factory, window, panes=4):
+        self.factory = factory
+        self.window = window
+        self.panes = panes
+        self.pane_length = window / panes
+        self.sketches = [factory() for _ in range(panes)]
+        self.pane = 0
+        self.packets = 0
+
+    def advance(self, pane):
+        # start pane, the sketches of every pane it expires are replaced
+        if pane > self.pane:
+            for expired in range(max(self.pane + 1, pane - self.panes + 1), pane + 1):
+                self.sketches[expired % self.panes] = self.factory()
+            self.pane = pane
+
+    def update(self, key, value, timestamp=None):
+        time = self.packets if timestamp is None else timestamp
+        self.packets += 1
+        self.advance(int(time // self.pane_length))
+        self.sketches[self.pane % self.panes].update(key, value)
+
+    def update_many(self, keys, values=None, timestamps=None):
+        # every run of updates within one pane is a single update_many
+        keys, values = as_batch(keys, values)
+        if timestamps is None:
+            timestamps = np.arange(self.packets, self.packets + len(keys))
+        self.packets += len(keys)
+        if len(keys) == 0:
+            return
+        panes = np.maximum.accumulate(np.maximum((np.asarray(timestamps) // self.pane_length).astype(np.int64), self.pane))
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(panes)) + 1, [len(keys)]))
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            self.advance(int(panes[start]))
+            self.sketches[self.pane % self.panes].update_many(keys[start:end], None if values is None else values[start:end])
+
+    def query(self, key):
+        return sum(sketch.query(key) for sketch in self.sketches)
+
+    def query_many(self, keys):
+        return sum(np.asarray(sketch.query_many(keys), dtype=np.float64) for sketch in self.sketches)
+
+    def items(self):
+        estimates = {}
+        for sketch in self.sketches:
+            for key, estimate in sketch.items():
+                estimates[key] = estimates.get(key, 0) + estimate
+        return estimates.items()
+
+    def top_k(self, k):
+        return heapq.nlargest(k, self.items(), key=lambda item: item[1])
+
+    def heavy_hitters(self, threshold):
+        return sorted(((key, estimate) for key, estimate in self.items() if estimate >= threshold),
+                      key=lambda item: -item[1])
+
+
+class Decayed:
+    def __init__(self, estimator, half_life):
+        if not getattr(estimator, "float_counts", False):
+            raise ValueError("Decayed needs an estimator with float counts: "
+                             "RAP with the dict backend, or MeanTail with rounded=False")
+        self.estimator = estimator
+        self.half_life = half_life
+        self.rate = math.log(2) / half_life
+        self.horizon = half_life * math.log2(RESCALE)
+        self.landmark = 0
+        self.now = 0
+        self.packets = 0
+
+    def weight(self, time):
+        return math.exp(self.rate * (time - self.landmark))
+
+    def rescale(self):
+        self.estimator.scale(1 / self.weight(self.now))
+        self.landmark = self.now
+
+    def update(self, key, value, timestamp=None):
+        time = self.packets if timestamp is None else timestamp
+        self.packets += 1
+        self.now = max(self.now, time)
+        if self.now - self.landmark >= self.horizon:
+            self.rescale()
+        self.estimator.update(key, value * self.weight(self.now))
+
+    def update_many(self, keys, values=None, timestamps=None):
+        # cut the batch wherever a rescale is due, weights are vectorized
+        keys, values = as_batch(keys, values)
+        if timestamps is None:
+            timestamps = np.arange(self.packets, self.packets + len(keys))
+        self.packets += len(keys)
+        times = np.maximum.accumulate(np.maximum(np.asarray(timestamps, dtype=np.float64), self.now))
+        start = 0
+        while start < len(keys):
+            if times[start] - self.landmark >= self.horizon:
+                self.now = times[start]
+                self.rescale()
+            end = start + max(1, int(np.searchsorted(times[start:], self.landmark + self.horizon)))
+            weights = np.exp(self.rate * (times[start:end] - self.landmark))
+            self.estimator.update_many(keys[start:end], weights if values is None else values[start:end] * weights)
+            self.now = times[end - 1]
+            start = end
+
+    def query(self, key):
+        return self.estimator.query(key) / self.weight(self.now)
+
+    def query_many(self, keys):
+        if hasattr(self.estimator, "query_many"):
+            return np.asarray(self.estimator.query_many(keys), dtype=np.float64) / self.weight(self.now)
+        return query_each(self.query, keys)
+
+    def items(self):
+        weight = self.weight(self.now)
+        return ((key, estimate / weight) for key, estimate in self.estimator.items())
+
+    def top_k(self, k):
+        weight = self.weight(self.now)
+        return [(key, estimate / weight) for key, estimate in self.estimator.top_k(k)]
+
+    def heavy_hitters(self, threshold):
+        weight = self.weight(self.now)
+        return [(key, estimate / weight) for key, estimate in self.estimator.heavy_hitters(threshold * weight)]
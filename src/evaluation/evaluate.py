@@ -8,33 +8,35 @@ from estimators.dist_counters import DistCounters
 from estimators.rap import RandomAdmissionPolicy
 import misc.distribution as dist
 from misc.logger import logger
+from misc.counts import KeyCounts
+from misc.traces import iter_chunks
+from evaluation.streaming import ingest, query_many
+from evaluation.metrics import aae, are
 
-from collections import Counter
 from random import randint
 from time import time
 import numpy as np
 
 import matplotlib.pyplot as plt
 
-def evaluate(estimator, stream):
-    for e in stream:
-        estimator.update(e, 1)
-    actual_counts = Counter(stream)
-    estimate_counts = {k: estimator.query(k) for k in actual_counts}
-    errors = {k: abs(estimate_counts[k]-a) for k, a in actual_counts.items()}
-    diff_counts_values_sorted = sorted(errors.values(), reverse=True)    
-    aae = sum(errors.values()) / len(actual_counts)
-    are = sum([errors[k]/v for k, v in actual_counts.items()]) / len(actual_counts)
-    return aae, are, diff_counts_values_sorted
+def evaluate(estimator, stream, chunk_size=2**20):
+    # every key is queried once, for both the metrics and the sorted errors
+    actual_counts = KeyCounts()
+    for chunk in iter_chunks(np.asarray(stream), chunk_size):
+        ingest(estimator, chunk)
+        actual_counts.add(chunk)
+    estimated = query_many(estimator, actual_counts.keys)
+    diff_counts_values_sorted = np.sort(np.abs(estimated - actual_counts.counts))[::-1]
+    return aae(actual_counts.counts, estimated), are(actual_counts.counts, estimated), diff_counts_values_sorted
 
-def narrow():
+def narrow(rng):
     stream_size = 10000
     key_count = 1000
     estimator_size = 32
     dists = [
-        dist.ExponentialDistribution(key_count),
-        dist.NormalDistribution(key_count),
-        dist.UniformDistribution(key_count),
+        dist.ExponentialDistribution(key_count, rng=rng),
+        dist.NormalDistribution(key_count, rng=rng),
+        dist.UniformDistribution(key_count, rng=rng),
     ]
     
     data = {}
@@ -70,15 +72,15 @@ def narrow():
     plt.tight_layout()
     plt.show()
 
-def broad():
+def broad(rng):
     min_stream_size = 1000
     max_stream_size = 10000
     key_count = 10000
     estimator_size = 1000
     data_points = 16
     dists = [
-        dist.ExponentialDistribution(key_count),
-        dist.NormalDistribution(key_count)
+        dist.ExponentialDistribution(key_count, rng=rng),
+        dist.NormalDistribution(key_count, rng=rng)
     ]
     
     data = {d.__class__.__name__ : {} for d in dists}
@@ -120,5 +122,6 @@ def broad():
 if __name__ == "__main__":
     np.seterr(all='raise')
     np.random.seed(42069)
-    broad()
+    # one Generator for every distribution, the streams are the same every run
+    broad(np.random.default_rng(42069))
     
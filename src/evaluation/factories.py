@@ -0,0 +1,32 @@
+from functools import partial
+
+from estimators.space_saving import SpaceSaving
+from estimators.rap import RandomAdmissionPolicy
+from estimators.mean_tail import MeanTail
+from estimators.frequent import Frequent, BatchedFrequent
+from estimators.effective_space_saving import EffectiveSpaceSaving
+from estimators.count_min import CountMin
+
+# The estimators the tests run through the same checks, one factory per
+# estimator and backend so that a new one is covered everywhere at once.
+# Tests that only apply to some of them filter on factory.func.
+
+def estimator_factories(size, seed=1):
+    return [
+        partial(SpaceSaving, size),
+        partial(RandomAdmissionPolicy, size, seed=seed),
+        partial(RandomAdmissionPolicy, size, backend="array", seed=seed),
+        partial(MeanTail, size, 0.25, seed=seed),
+        partial(MeanTail, size, 0.25, backend="array", seed=seed),
+        partial(Frequent, size),
+        partial(BatchedFrequent, size),
+        partial(EffectiveSpaceSaving, size, 0.25, seed=seed),
+        partial(CountMin, size, 4, seed=seed),
+    ]
+
+def ingested(factories, stream):
+    # a fresh estimator per factory, after update_many(stream)
+    for factory in factories:
+        estimator = factory()
+        estimator.update_many(stream)
+        yield estimator
@@ -1,11 +1,16 @@
-from collections import Counter
+import sys
+import os
 import numpy as np
-from scipy.optimize import curve_fit
+from scipy.optimize import curve_fit, minimize_scalar
 from scipy.special import zetac
 import matplotlib.pyplot as plt
 from scipy.stats import lognorm
 from scipy.integrate import quad
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from misc.counts import KeyCounts
+
 # Define the fitting functions
 def zipfian_fit(x, a):
     return np.float_power(x, -a) / zetac(a)
@@ -32,29 +37,95 @@ def lognormal_integer_fit(x, s, scale):
     total_probability, _ = quad(pdf, x, x + 1)
     return total_probability
 
-def estimate_params(packets: list):
-    counter = Counter(packets)
-    packets_counts = np.array(sorted(list(counter.values()), key=lambda x: -x))
-    frequency = packets_counts / len(packets)
+# Vectorized fits of the rank-frequency curve instead of iterative curve_fit
+# calls. The log-normal is a parabola in log-log space, a closed-form least
+# squares. The power law amplitude is linear given the exponent, so only the
+# exponent is searched, and the Zipf exponent is a single scalar minimization
+# of either the squared error or the negative log-likelihood of the counts.
+# With bins set, only log-spaced ranks are used for fitting, the SSRs are
+# always over every rank.
+
+ZIPF_BOUNDS = (1.0001, 10.0)
+
+def log_binned_ranks(n_ranks, bins=None):
+    # 1-based ranks to fit on, all of them or about bins log-spaced ones
+    if bins is None or bins >= n_ranks:
+        return np.arange(1, n_ranks + 1)
+    return np.unique(np.geomspace(1, n_ranks, bins).round().astype(np.int64))
+
+def fit_power_law(rank, frequency):
+    log_rank = np.log(rank)
+    def amplitude(b):
+        x = np.exp(-b * log_rank)
+        return np.dot(frequency, x) / np.dot(x, x), x
+    def objective(b):
+        a, x = amplitude(b)
+        return np.sum((frequency - a * x) ** 2)
+    b = minimize_scalar(objective, bounds=(0.01, 10.0), method="bounded").x
+    return amplitude(b)[0], b
+
+def fit_lognormal(rank, frequency):
+    # log(x * pdf(x)) is a parabola in log(x) with leading term -1/(2s^2)
+    log_rank = np.log(rank)
+    c2, c1, _ = np.polyfit(log_rank, np.log(frequency) + log_rank, 2)
+    if c2 >= 0:
+        # not concave, fall back to the iterative fit
+        params, _ = curve_fit(lognormal_fit, rank, frequency, p0=[1.0, 1.0])
+        return tuple(params)
+    return np.sqrt(-1 / (2 * c2)), np.exp(-c1 / (2 * c2))
+
+def _minimize(objective, around=None):
+    # bounded scalar minimization, first near the previous solution if any
+    if around is not None:
+        low, high = max(ZIPF_BOUNDS[0], around - 0.25), min(ZIPF_BOUNDS[1], around + 0.25)
+        result = minimize_scalar(objective, bounds=(low, high), method="bounded")
+        edge = 1e-3 * (high - low)
+        if (result.x - low > edge or low == ZIPF_BOUNDS[0]) and (high - result.x > edge or high == ZIPF_BOUNDS[1]):
+            return result.x
+    return minimize_scalar(objective, bounds=ZIPF_BOUNDS, method="bounded").x
+
+def fit_zipfian(rank, frequency, counts=None, around=None):
+    # least squares of zipfian_fit, or the MLE of a Zipf law truncated to the
+    # observed ranks when the counts of every rank are given
+    if counts is None:
+        return _minimize(lambda a: np.sum((frequency - zipfian_fit(rank, a)) ** 2), around)
+    log_rank = np.log(np.arange(1, len(counts) + 1))
+    weighted_log_rank = np.dot(counts, log_rank)
+    total = np.sum(counts)
+    def negative_log_likelihood(a):
+        return a * weighted_log_rank + total * np.log(np.sum(np.exp(-a * log_rank)))
+    return _minimize(negative_log_likelihood, around)
+
+def ssr(model, rank, frequency, *params):
+    return np.sum((frequency - model(rank, *params)) ** 2)
+
+def fit_frequencies(counts, bins=None, zipf_mle=False, previous=None):
+    # counts in decreasing order, e.g. KeyCounts.rank_frequencies()
+    counts = np.asarray(counts, dtype=np.float64)
+    frequency = counts / counts.sum()
     rank = np.arange(1, len(frequency) + 1)
-    
-    # Zipfian fit
-    zipf_params, _ = curve_fit(zipfian_fit, rank, frequency, p0=[1.1], bounds=(1, np.inf))
-    a_zipf = zipf_params[0]
-    zipfian_residuals = frequency - zipfian_fit(rank, *zipf_params)
-    zipfian_ssr = np.sum(zipfian_residuals**2)
-    
-    # Power-law fit
-    power_law_params, _ = curve_fit(power_law_fit, rank, frequency, p0=[1.0, 1.1])
-    a_power_law, b_power_law = power_law_params
-    power_law_residuals = frequency - power_law_fit(rank, *power_law_params)
-    power_law_ssr = np.sum(power_law_residuals**2)
-    
-    # Log-normal fit
-    lognormal_params, _ = curve_fit(lognormal_fit, rank, frequency, p0=[1.0, 1.0])
-    s_lognormal, scale_lognormal = lognormal_params
-    lognormal_residuals = frequency - lognormal_fit(rank, *lognormal_params)
-    lognormal_ssr = np.sum(lognormal_residuals**2)
+    sample = log_binned_ranks(len(rank), bins)
+    a_zipf = fit_zipfian(sample, frequency[sample - 1], counts if zipf_mle else None,
+                         previous["Zipfian"] if previous else None)
+    power_law_params = fit_power_law(sample, frequency[sample - 1])
+    lognormal_params = fit_lognormal(sample, frequency[sample - 1])
+    return {
+        "Zipfian": a_zipf,
+        "Power Law": tuple(power_law_params),
+        "Log-normal": tuple(lognormal_params),
+        "SSR": {
+            "Zipfian": ssr(zipfian_fit, rank, frequency, a_zipf),
+            "Power Law": ssr(power_law_fit, rank, frequency, *power_law_params),
+            "Log-normal": ssr(lognormal_fit, rank, frequency, *lognormal_params),
+        },
+    }
+
+def estimate_params(packets: list, actual_counts: KeyCounts = None, bins=None, zipf_mle=False):
+    # actual_counts of the packets, e.g. from the trace count cache
+    if actual_counts is None:
+        actual_counts = KeyCounts()
+        actual_counts.add(packets)
+    params = fit_frequencies(actual_counts.rank_frequencies(), bins, zipf_mle)
     
     '''
     # Log-normal fit mean variance
@@ -80,13 +151,26 @@ def estimate_params(packets: list):
     plt.grid(True)
     plt.show()
     '''
-    
-    print(f"SSR for Zipfian fit: {zipfian_ssr:.4f}")
-    print(f"SSR for Power law fit: {power_law_ssr:.4f}")
-    print(f"SSR for Log-normal fit: {lognormal_ssr:.4f}")
-    
-    return {
-        "Zipfian": a_zipf,
-        "Power Law": (a_power_law, b_power_law),
-        "Log-normal": (s_lognormal, scale_lognormal)
-    }
\ No newline at end of file
+
+    print(f"SSR for Zipfian fit: {params['SSR']['Zipfian']:.4f}")
+    print(f"SSR for Power law fit: {params['SSR']['Power Law']:.4f}")
+    print(f"SSR for Log-normal fit: {params['SSR']['Log-normal']:.4f}")
+
+    return params
+
+class PrefixFitter:
+    # Refits a growing trace prefix: new keys are merged into the counts of
+    # the shorter prefix and the Zipf search starts near the previous fit.
+    def __init__(self, bins=None, zipf_mle=False):
+        self.counts = KeyCounts()
+        self.bins = bins
+        self.zipf_mle = zipf_mle
+        self.params = None
+
+    def extend(self, chunk):
+        self.counts.add(chunk)
+        return self.fit()
+
+    def fit(self):
+        self.params = fit_frequencies(self.counts.rank_frequencies(), self.bins, self.zipf_mle, self.params)
+        return self.params
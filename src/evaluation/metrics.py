@@ -0,0 +1,56 @@
+import numpy as np
+
+# Error metrics over aligned arrays: actual[i] is the true count of some key
+# and estimated[i] the estimator's answer for the same key, e.g. the counts
+# of a KeyCounts and query_many() over its keys.
+
+def mse(actual, estimated):
+    return np.mean((np.asarray(estimated, dtype=np.float64) - actual) ** 2)
+
+def aae(actual, estimated):
+    return np.mean(np.abs(np.asarray(estimated, dtype=np.float64) - actual))
+
+def are(actual, estimated):
+    return np.mean(np.abs(np.asarray(estimated, dtype=np.float64) - actual) / actual)
+
+def weighted_aae(actual, estimated, weights=None):
+    # absolute error averaged with the given weights, by default the true
+    # counts, i.e. the average error seen per packet rather than per key
+    weights = actual if weights is None else weights
+    return np.average(np.abs(np.asarray(estimated, dtype=np.float64) - actual), weights=weights)
+
+def weighted_are(actual, estimated):
+    # total absolute error relative to the stream length
+    return np.sum(np.abs(np.asarray(estimated, dtype=np.float64) - actual)) / np.sum(actual)
+
+def top_k(values, k):
+    # indexes of the k largest values, in no particular order
+    values = np.asarray(values)
+    if k >= len(values):
+        return np.arange(len(values))
+    return np.argpartition(values, len(values) - k)[len(values) - k:]
+
+def recall_at_k(actual, estimated, k):
+    # fraction of the true top-k keys that the estimator tracks (estimate > 0)
+    top = top_k(actual, k)
+    return np.count_nonzero(np.asarray(estimated)[top] > 0) / len(top)
+
+def precision_at_k(actual, estimated, k):
+    # fraction of the estimator's top-k keys that are in the true top-k
+    true_top = np.zeros(len(actual), dtype=np.bool_)
+    true_top[top_k(actual, k)] = True
+    estimated_top = top_k(estimated, k)
+    return np.count_nonzero(true_top[estimated_top]) / len(estimated_top)
+
+def summarize(actual, estimated, k=None):
+    result = {
+        "mse": mse(actual, estimated),
+        "aae": aae(actual, estimated),
+        "are": are(actual, estimated),
+        "weighted_aae": weighted_aae(actual, estimated),
+        "weighted_are": weighted_are(actual, estimated),
+    }
+    if k is not None:
+        result["recall"] = recall_at_k(actual, estimated, k)
+        result["precision"] = precision_at_k(actual, estimated, k)
+    return result
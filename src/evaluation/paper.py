@@ -7,102 +7,97 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 import numpy as np
 import matplotlib.pyplot as plt
-from collections import Counter
 from estimators.count_min import CountMin
 from estimators.frequent import Frequent
 from estimators.effective_space_saving import EffectiveSpaceSaving
 from estimators.space_saving import SpaceSaving
 from estimators.rap import RandomAdmissionPolicy
 from estimators.mean_tail import MeanTail
-from multiprocessing import Pool
+from misc.traces import read_trace
+from misc.counts import trace_counts
+from evaluation.sweep import sweep, write_csv
+from evaluation.scheduler import run_tasks
+from evaluation.results import ResultStore
+from functools import partial
 from datetime import datetime
 
 
-# Function to read trace files
-def read_trace(file_path, n=None):
-    with open(file_path, "r") as file:
-        if n is not None:
-            return [int(next(file).strip()) for _ in range(n)]
-        else:
-            return [int(line.strip()) for line in file]
+def calculate_mt_length(int_count, tail_percentage):
+    length = int_count / (2 - tail_percentage)
+    return length
 
 
-def calculate_mse(estimator, actual_counts):
-    errors = np.zeros(len(actual_counts))
-    i = 0
-    estimates = [estimator.query(k) for k in actual_counts]
-    errors = [(v_est - v) ** 2 for v_est, v in zip(estimates, actual_counts.values())]
-    return np.average(errors)
+def from_memory(estimator_class, memory, **kwargs):
+    # estimators are sized by their memory budget at 8 bytes per counter
+    return estimator_class(memory // 8, **kwargs)
 
 
-def calculate_recall(estimator, actual_counts, count_hh):
-    top_k_pairs = sorted(actual_counts.items(), key=lambda item: item[1], reverse=True)[
-        :count_hh
-    ]
-    top_k = [p[0] for p in top_k_pairs]
-    estimates = [estimator.query(k) for k in top_k]
-    TP = len([e for e in estimates if e > 0])
-    FN = len(estimates) - TP
-    recall = TP / (TP + FN)
-    return recall
+TRACE_LEN = 1000000
+RESULTS_PATH = "paper_results.sqlite"
+RECALL_HEAVY_HITTERS = 10000
+ESTIMATORS = {
+    # "FR": partial(from_memory, Frequent),
+    # "SS": partial(from_memory, SpaceSaving),
+    "ESS": partial(from_memory, EffectiveSpaceSaving, mem_percentage_candidates=0.125),
+    "RAP": partial(from_memory, RandomAdmissionPolicy),
+    "MT16": partial(from_memory, MeanTail, mem_percentage_tail=0.0625),
+    "MT8": partial(from_memory, MeanTail, mem_percentage_tail=0.125),
+    "MT4": partial(from_memory, MeanTail, mem_percentage_tail=0.25),
+}
 
 
-def calculate_mt_length(int_count, tail_percentage):
-    length = int_count / (2 - tail_percentage)
-    return length
+def memory_usages(trace_file):
+    actual_counts = trace_counts(trace_file, TRACE_LEN)
+    log2_count_keys = math.ceil(math.log2(len(actual_counts)))
+    return [2**e for e in np.linspace(log2_count_keys-1, log2_count_keys+3, 20)]
+
+
+def trace_name(trace_file):
+    return os.path.splitext(os.path.basename(trace_file))[0]
+
 
 # Process each trace file
 def process_trace(trace_file):
-    linestyles = ["-", "--", ":", "-."] * 2
-    markers = ["o", "s", "D", "^", "*", ">"] * 2
-    trace_len = 1000000
-    recall_heavy_hitters = 10000
-
     # Get the start time
     start_time = datetime.now()
     print(f"Start processing {trace_file} at {start_time}")
 
-    trace = read_trace(trace_file, trace_len)
-    actual_counts = Counter(trace)
+    trace = read_trace(trace_file, TRACE_LEN)
+    configs = [
+        (estimator_name, factory, {"memory": memory_usage_bytes})
+        for memory_usage_bytes in memory_usages(trace_file)
+        for estimator_name, factory in ESTIMATORS.items()
+    ]
 
-    memory_usages = []
-    mse_values = {}
-    recall_values = {}
+    # Run all the estimators in a single pass over the trace
+    rows = sweep(trace, configs, k=RECALL_HEAVY_HITTERS, truth=trace_counts(trace_file, TRACE_LEN))
+    write_csv(rows, f"results_{trace_name(trace_file)}.csv")
+    output_file = plot_results(trace_file, rows)
+
+    # Get the end time and print it
+    end_time = datetime.now()
+    print(f"Finished processing {trace_file} at {end_time}, saved as {output_file}")
+    print(f"Duration: {end_time - start_time}")
 
-    log2_count_keys = math.ceil(math.log2(len(actual_counts)))
 
-    # Run experiments with different estimators
-    for estimator_exp in np.linspace(log2_count_keys-1, log2_count_keys+3, 20):
-        memory_usage_bytes = 2**estimator_exp
-        memory_usages.append(memory_usage_bytes)
-        estimator_length = memory_usage_bytes // 8
-        estimators = {
-            # "FR": Frequent(estimator_length),
-            # "SS": SpaceSaving(estimator_length),
-            # "ESS": EffectiveSpaceSaving(estimator_length, 0.125),
-            "RAP": RandomAdmissionPolicy(estimator_length),
-            "MT16": MeanTail(estimator_length, 0.0625),
-            "MT8": MeanTail(estimator_length, 0.125),
-            "MT4": MeanTail(estimator_length, 0.25),
-        }
-
-        for estimator_name, estimator in estimators.items():
-            for k in trace:
-                estimator.update(k, 1)
-            mse = calculate_mse(estimator, actual_counts)
-            recall = calculate_recall(estimator, actual_counts, recall_heavy_hitters)
-            if estimator_name not in mse_values:
-                mse_values[estimator_name] = []
-                recall_values[estimator_name] = []
-            mse_values[estimator_name].append(mse)
-            recall_values[estimator_name].append(recall)
+def plot_results(trace_file, rows):
+    linestyles = ["-", "--", ":", "-."] * 2
+    markers = ["o", "s", "D", "^", "*", ">"] * 2
+
+    memory_values = {}
+    mse_values = {}
+    recall_values = {}
+    for row in sorted(rows, key=lambda row: row["memory"]):
+        memory_values.setdefault(row["estimator"], []).append(row["memory"])
+        mse_values.setdefault(row["estimator"], []).append(row["mse"])
+        recall_values.setdefault(row["estimator"], []).append(row["recall"])
 
     # Plotting the results
     plt.figure()
     i = 0
     for estimator_name, mse_list in mse_values.items():
         plt.plot(
-            memory_usages,
+            memory_values[estimator_name],
             mse_list,
             label=estimator_name,
             marker=markers[i],
@@ -119,10 +114,10 @@ def process_trace(trace_file):
     plt.tight_layout()
   
     # Save the graph with the trace file name
-    output_file = f"mse_{os.path.splitext(os.path.basename(trace_file))[0]}.png"
+    output_file = f"mse_{trace_name(trace_file)}.png"
     plt.savefig(output_file)
 
-    legend = plt.legend(ncol=len(estimators))
+    legend = plt.legend(ncol=len(mse_values))
     # save legend as figure
     fig = legend.figure
     fig.canvas.draw()
@@ -134,7 +129,7 @@ def process_trace(trace_file):
     i = 0
     for estimator_name, recall_list in recall_values.items():
         plt.plot(
-            memory_usages,
+            memory_values[estimator_name],
             recall_list,
             label=estimator_name,
             marker=markers[i],
@@ -150,13 +145,10 @@ def process_trace(trace_file):
     plt.tight_layout()
 
     # Save the graph with the trace file name
-    output_file = f"recall_{os.path.splitext(os.path.basename(trace_file))[0]}.png"
+    output_file = f"recall_{trace_name(trace_file)}.png"
     plt.savefig(output_file)
-
-    # Get the end time and print it
-    end_time = datetime.now()
-    print(f"Finished processing {trace_file} at {end_time}, saved as {output_file}")
-    print(f"Duration: {end_time - start_time}")
+    plt.close("all")
+    return output_file
 
 
 # Main function to execute in parallel
@@ -170,10 +162,47 @@ def main():
         if f.endswith(".trace")
     ]
 
-    # Run the trace processing in parallel
-    with Pool() as pool:
-        pool.map(process_trace, trace_files)
+    # One task per (trace, estimator, memory size), balanced over all cores
+    tasks = []
+    for trace_file in trace_files:
+        for memory_usage_bytes in memory_usages(trace_file):
+            for estimator_name, factory in ESTIMATORS.items():
+                tasks.append({
+                    "trace": trace_file,
+                    "n": TRACE_LEN,
+                    "estimator": estimator_name,
+                    "factory": factory,
+                    "params": {"memory": memory_usage_bytes},
+                    "seed": 0,
+                    "cost": TRACE_LEN * math.log2(memory_usage_bytes),
+                })
+    # Configurations that already have results in the store are skipped
+    store = ResultStore(RESULTS_PATH)
+    rows = run_tasks(tasks, store, k=RECALL_HEAVY_HITTERS)
+    store.close()
+
+    for trace_file in trace_files:
+        output_file = plot_results(trace_file, [row for row in rows if row["trace"] == trace_file])
+        print(f"Finished processing {trace_file}, saved as {output_file}")
+
+
+# Re-render the figures from stored results without running anything
+def plot():
+    store = ResultStore(RESULTS_PATH)
+    rows = store.rows()
+    store.close()
+    for trace_file in sorted({row["trace"] for row in rows}):
+        # only keep the most recent result of every configuration
+        latest = {}
+        for row in rows:
+            if row["trace"] == trace_file and row["estimator"] in ESTIMATORS:
+                latest[(row["estimator"], row["memory"])] = row
+        output_file = plot_results(trace_file, list(latest.values()))
+        print(f"Rendered {trace_file} from {RESULTS_PATH}, saved as {output_file}")
 
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ["plot"]:
+        plot()
+    else:
+        main()
@@ -0,0 +1,71 @@
+import random
+from functools import reduce
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from misc.traces import read_trace, iter_chunks
+from evaluation.streaming import ingest
+from evaluation.scheduler import SharedArray, attach
+
+# Sharded ingest of a single stream over several processes. Every worker
+# reads the whole trace (memory-mapped from its path, or attached from
+# shared memory for an array), keeps its own shard and ingests it into its
+# own estimator, then the shard estimators are merged with merge(other).
+#   how="hash": each key always goes to the same shard, so every key is
+#     counted by a single estimator,
+#   how="round_robin": chunk i goes to shard i % shards, every shard sees
+#     the overall key distribution.
+
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+def shard_of(keys, shards):
+    return ((np.asarray(keys, dtype=np.uint64) * HASH_MULTIPLIER) >> np.uint64(32)) % np.uint64(shards)
+
+def shard_chunks(trace, shard, shards, chunk_size, how="hash"):
+    for i, chunk in enumerate(iter_chunks(trace, chunk_size)):
+        if how == "hash":
+            yield chunk[shard_of(chunk, shards) == shard]
+        elif how == "round_robin":
+            if i % shards == shard:
+                yield chunk
+        else:
+            raise ValueError(f"unknown sharding {how!r}")
+
+def _ingest(estimator, trace, shard, shards, chunk_size, how):
+    for chunk in shard_chunks(trace, shard, shards, chunk_size, how):
+        ingest(estimator, chunk)
+
+def ingest_shard(factory, source, n, shard, shards, chunk_size, how, seed):
+    # source is a trace path or a shared memory descriptor
+    random.seed(seed + shard)
+    np.random.seed(seed + shard)
+    estimator = factory()
+    if isinstance(source, tuple):
+        shm, trace = attach(source)
+        _ingest(estimator, trace, shard, shards, chunk_size, how)
+        # the segment can only be closed once no view of it is left
+        del trace
+        shm.close()
+    else:
+        _ingest(estimator, read_trace(source, n), shard, shards, chunk_size, how)
+    return estimator
+
+def parallel_ingest(factory, source, shards, max_workers=None, chunk_size=2**20, n=None, how="hash", seed=0):
+    # factory() builds one estimator per shard and must be picklable,
+    # returns the merged estimator. Every shard is seeded differently, so
+    # a sketch that only merges with identical hash functions needs a fixed
+    # seed in the factory, e.g. partial(CountMin, width, depth, seed=1).
+    shared = None
+    if isinstance(source, np.ndarray):
+        shared = SharedArray(source if n is None else source[:n])
+        source, n = shared.descriptor, None
+    try:
+        with ProcessPoolExecutor(max_workers or shards) as executor:
+            futures = [executor.submit(ingest_shard, factory, source, n, shard, shards, chunk_size, how, seed)
+                       for shard in range(shards)]
+            estimators = [future.result() for future in futures]
+    finally:
+        if shared is not None:
+            shared.release()
+    return reduce(lambda merged, estimator: merged.merge(estimator), estimators)
@@ -0,0 +1,84 @@
+import os
+import json
+import hashlib
+import sqlite3
+from time import time
+
+# Append-only SQLite store of experiment results. A result is identified by
+# the hash of the trace prefix, the estimator name, its parameters, the seed,
+# the top-k used for recall and the version of the estimator code, so sweeps
+# can skip what is already computed and plots can be rendered from the
+# store without re-running anything.
+
+ESTIMATORS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "estimators"))
+
+def code_version():
+    # hash of the estimator sources, any change to them invalidates results
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(ESTIMATORS_DIR)):
+        if name.endswith(".py"):
+            with open(os.path.join(ESTIMATORS_DIR, name), "rb") as f:
+                digest.update(name.encode())
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def _params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+class ResultStore:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                trace_hash TEXT NOT NULL,
+                trace TEXT,
+                n INTEGER,
+                estimator TEXT NOT NULL,
+                params TEXT NOT NULL,
+                seed INTEGER,
+                k INTEGER,
+                code_version TEXT NOT NULL,
+                metrics TEXT NOT NULL,
+                created REAL,
+                UNIQUE (trace_hash, n, estimator, params, seed, k, code_version)
+            )"""
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def _where(self, trace_hash, n, estimator, params, seed, k, code_version):
+        return (
+            "trace_hash = ? AND n IS ? AND estimator = ? AND params = ? AND seed IS ? AND k IS ? AND code_version = ?",
+            (trace_hash, n, estimator, _params_key(params), seed, k, code_version),
+        )
+
+    def get(self, trace_hash, n, estimator, params, seed, k, code_version):
+        where, args = self._where(trace_hash, n, estimator, params, seed, k, code_version)
+        rows = self.rows(where, args)
+        return rows[0] if rows else None
+
+    def has(self, trace_hash, n, estimator, params, seed, k, code_version):
+        where, args = self._where(trace_hash, n, estimator, params, seed, k, code_version)
+        return self.connection.execute(f"SELECT 1 FROM results WHERE {where}", args).fetchone() is not None
+
+    def add(self, trace_hash, n, estimator, params, seed, k, code_version, metrics, trace=None):
+        # results are committed one by one so an interrupted sweep keeps them
+        self.connection.execute(
+            "INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (trace_hash, trace, n, estimator, _params_key(params), seed, k, code_version, json.dumps(metrics), time()),
+        )
+        self.connection.commit()
+
+    def rows(self, where="1", args=()):
+        # flat rows: identity columns, then parameters, then metrics
+        rows = []
+        query = f"SELECT trace_hash, trace, n, estimator, params, seed, k, code_version, metrics FROM results WHERE {where} ORDER BY created"
+        for trace_hash, trace, n, estimator, params, seed, k, version, metrics in self.connection.execute(query, args):
+            row = {"trace_hash": trace_hash, "trace": trace, "n": n, "estimator": estimator}
+            row.update(json.loads(params))
+            row.update({"seed": seed, "k": k, "code_version": version})
+            row.update(json.loads(metrics))
+            rows.append(row)
+        return rows
@@ -0,0 +1,118 @@
+import random
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from misc.logger import logger
+from misc.counts import KeyCounts, trace_counts
+from misc.traces import read_trace, iter_chunks, trace_hash
+from evaluation.streaming import ingest, error_metrics
+from evaluation.results import code_version
+from estimators.instrumentation import instrument
+
+# Process-pool sweep scheduler. A sweep is split into independent tasks,
+# one per (trace, estimator, parameters, seed), each a dict:
+#   {"trace": path, "n": prefix length, "estimator": name,
+#    "factory": picklable callable, "params": dict, "seed": int,
+#    "cost": optional relative cost,
+#    "stats": optional, instrument the estimator, "sample_every": optional}
+# Every trace prefix and its ground truth are copied into shared memory once
+# and attached by the workers. Tasks are submitted longest job first and
+# every result is added to a ResultStore as soon as it completes, tasks that
+# already have a result in the store are skipped.
+
+class SharedArray:
+    def __init__(self, array):
+        array = np.ascontiguousarray(array)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)[:] = array
+        self.descriptor = (self.shm.name, array.shape, array.dtype.str)
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+def attach(descriptor):
+    name, shape, dtype = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+# per-worker (trace, n) -> (trace keys, ground truth), filled by _init_worker
+_attached = {}
+_segments = []
+
+def _init_worker(descriptors):
+    for trace_id, (trace, keys, counts) in descriptors.items():
+        arrays = []
+        for descriptor in (trace, keys, counts):
+            shm, array = attach(descriptor)
+            _segments.append(shm)
+            arrays.append(array)
+        _attached[trace_id] = arrays[0], KeyCounts(arrays[1], arrays[2])
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+def run_task(task, chunk_size=2**20, k=None):
+    trace, truth = _attached[(task["trace"], task["n"])]
+    random.seed(task["seed"])
+    np.random.seed(task["seed"])
+    estimator = task["factory"](**task["params"])
+    if task.get("stats"):
+        instrument(estimator, task.get("sample_every", 0))
+    t0 = perf_counter()
+    for chunk in iter_chunks(trace, chunk_size):
+        ingest(estimator, chunk)
+    metrics = {"ingest_seconds": perf_counter() - t0}
+    metrics.update(error_metrics(estimator, truth, k))
+    return {c: _plain(v) for c, v in metrics.items()}
+
+def share_traces(tasks):
+    shared = {}
+    for task in tasks:
+        trace_id = (task["trace"], task["n"])
+        if trace_id in shared:
+            continue
+        trace = read_trace(task["trace"], task["n"])
+        truth = trace_counts(task["trace"], task["n"])
+        shared[trace_id] = [SharedArray(trace), SharedArray(truth.keys), SharedArray(truth.counts)]
+    return shared
+
+def run_tasks(tasks, store, max_workers=None, chunk_size=2**20, k=None):
+    # returns the stored rows of all the tasks that have a result
+    version = code_version()
+    hashes = {}
+    for task in tasks:
+        trace_id = (task["trace"], task["n"])
+        if trace_id not in hashes:
+            hashes[trace_id] = trace_hash(*trace_id)
+
+    def key(task):
+        return hashes[(task["trace"], task["n"])], task["n"], task["estimator"], task["params"], task["seed"], k, version
+
+    pending = [task for task in tasks if not store.has(*key(task))]
+    logger.info(f"{len(tasks) - len(pending)} of {len(tasks)} tasks already have results")
+    if pending:
+        shared = share_traces(pending)
+        try:
+            descriptors = {trace_id: tuple(a.descriptor for a in arrays) for trace_id, arrays in shared.items()}
+            # longest job first keeps every core busy until the very end
+            ordered = sorted(pending, key=lambda task: task.get("cost", task["n"]), reverse=True)
+            with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(descriptors,)) as executor:
+                futures = {executor.submit(run_task, task, chunk_size, k): task for task in ordered}
+                for future in as_completed(futures):
+                    task = futures[future]
+                    try:
+                        metrics = future.result()
+                    except Exception:
+                        logger.exception(f"task {task['estimator']} {task['params']} on {task['trace']} failed")
+                        continue
+                    store.add(*key(task), metrics, trace=task["trace"])
+        finally:
+            for arrays in shared.values():
+                for array in arrays:
+                    array.release()
+    rows = (store.get(*key(task)) for task in tasks)
+    return [row for row in rows if row is not None]
@@ -1,12 +1,9 @@
 import sys
 import os
-from collections import Counter
 from concurrent.futures import ProcessPoolExecutor, as_completed
-from scipy.optimize import curve_fit
 import matplotlib.pyplot as plt
 import numpy as np
 from scipy import stats
-import multiprocessing as mp
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
@@ -16,7 +13,10 @@ from estimators.auto_dist_counters import AutoDistCounters
 from estimators.rap import RandomAdmissionPolicy
 from estimators.space_saving import SpaceSaving
 import misc.distribution as dist
-from evaluation.fit_zipfian import estimate_params
+from misc.traces import read_trace
+from evaluation.fit_zipfian import PrefixFitter
+from evaluation.streaming import evaluate_stream, query_many
+from evaluation.metrics import aae, are
 
 def lognormal_fit_mean_variance(x, mean, variance):
     stddev = np.sqrt(variance)
@@ -24,47 +24,28 @@ def lognormal_fit_mean_variance(x, mean, variance):
     exponent = -((np.log(x) - mean) ** 2) / (2 * variance)
     return coefficient * np.exp(exponent)
 
-def read_trace(file_path, n=None):
-    with open(file_path, "r") as file:
-        if n is not None:
-            return [int(next(file).strip()) for _ in range(n)]
-        else:
-            return [int(line.strip()) for line in file]
-
 def evaluate(estimator, stream):
-    for i, e in enumerate(stream):
-        estimator.update(e, 1)
-    actual_counts = Counter(stream)
-    estimate_counts = {k: estimator.query(k) for k in actual_counts}
-    errors = {k: abs(estimate_counts[k] - a) for k, a in actual_counts.items()}
-    aae = sum(errors.values())
-    are = sum([errors[k] / v for k, v in actual_counts.items()]) / len(actual_counts)
-    return are, aae
+    actual_counts, _ = evaluate_stream(estimator, np.asarray(stream))
+    estimates = query_many(estimator, actual_counts.keys)
+    return are(actual_counts.counts, estimates), aae(actual_counts.counts, estimates) * len(actual_counts)
 
 def power_law_fit(x, a, b):
     return a * np.power(x, -b)
 
-def estimate_params(packets: list, adc_length: int):
-    counter = Counter(packets)
-    packets_counts = np.array(sorted(list(counter.values()), key=lambda x: -x))
-    frequency = packets_counts / len(packets)
+def estimate_params(packets: list, adc_length: int, fitter: PrefixFitter):
+    # fitter has already been extended with the packets
+    frequency = fitter.counts.rank_frequencies() / fitter.counts.total
     rank = np.arange(1, len(frequency) + 1)
     rank_hh = rank[:adc_length]
     frequency_hh = frequency[:adc_length]
     
-    print("fit log-normal...")
-    # Log-normal fit    
-    lognormal_params, _ = curve_fit(lognormal_fit_mean_variance, rank, frequency, p0=[1.0, 1.0])
+    print("fit log-normal and power law...")
+    params = fitter.params
+    s_lognormal, scale_lognormal = params["Log-normal"]
+    lognormal_params = np.log(scale_lognormal), s_lognormal**2
     mean_lognormal, variance_lognormal = lognormal_params
-    lognormal_residuals = frequency - lognormal_fit_mean_variance(rank, *lognormal_params)
-    lognormal_ssr = np.sum(lognormal_residuals**2)
-    
-    print("fit power law...")
-    # Power-law fit
-    power_law_params, _ = curve_fit(power_law_fit, rank, frequency, p0=[1.0, 1.1])
+    power_law_params = params["Power Law"]
     a_power_law, b_power_law = power_law_params
-    power_law_residuals = frequency - power_law_fit(rank, *power_law_params)
-    power_law_ssr = np.sum(power_law_residuals**2)
     
     print("fit adc...")
     # ADC fit
@@ -89,11 +70,12 @@ def estimate_params(packets: list, adc_length: int):
     plt.grid(True)
     plt.show()
 
-def worker(trace_len):
+def worker(trace, trace_len, fitter):
+    # fitter holds the fit of a shorter prefix and is extended to trace_len
     print(f"Processing trace_len = {trace_len}...")
-    trace = read_trace("src/traces/trace.txt", trace_len)
+    fitter.extend(trace[fitter.counts.total:trace_len])
     adc_len = int(trace_len * 0.01)
-    estimate_params(trace, adc_len)
+    estimate_params(trace[:trace_len], adc_len, fitter)
     return trace_len
 
 def main():
@@ -104,9 +86,11 @@ def main():
     step_size = (end_len - start_len) // num_jumps
     trace_len_values = range(start_len, end_len + step_size, step_size)
 
-    # Create a pool of workers, one for each trace_len
-    with mp.Pool() as pool:
-        pool.map(worker, trace_len_values)
+    # Each prefix is fitted incrementally from the previous one
+    trace = read_trace("src/traces/trace.txt", trace_len_values[-1])
+    fitter = PrefixFitter(bins=1000)
+    for trace_len in trace_len_values:
+        worker(trace, trace_len, fitter)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+
+from misc.counts import KeyCounts
+from misc.traces import iter_chunks, iter_weighted_chunks
+from estimators.instrumentation import estimator_stats
+from evaluation.metrics import summarize
+
+# Chunked evaluation: the stream is pulled in fixed-size chunks from a trace
+# path, an array or any iterable of arrays, fed to the estimator and counted
+# exactly in a KeyCounts, so memory stays bounded by the number of distinct
+# keys rather than the stream length.
+# Weighted streams, e.g. byte counts, come as (keys, sizes) chunks from a
+# weighted trace path, a (keys, sizes) pair of arrays or an iterable of such
+# pairs, and every packet counts its size.
+
+def as_chunks(source, chunk_size, n=None, weighted=False):
+    if weighted:
+        if isinstance(source, (str, os.PathLike)) or (isinstance(source, tuple) and isinstance(source[0], np.ndarray)):
+            return iter_weighted_chunks(source, chunk_size, n)
+        return source
+    if isinstance(source, (str, os.PathLike, np.ndarray)):
+        return iter_chunks(source, chunk_size, n)
+    return source
+
+def _length(chunk):
+    return len(chunk[0]) if isinstance(chunk, tuple) else len(chunk)
+
+def _cut(chunk, start, stop=None):
+    if isinstance(chunk, tuple):
+        return tuple(array[start:stop] for array in chunk)
+    return chunk[start:stop]
+
+def split_at_checkpoints(chunks, checkpoint_every):
+    # re-cut chunks so that every checkpoint falls on a chunk boundary
+    until_checkpoint = checkpoint_every
+    for chunk in chunks:
+        while _length(chunk) >= until_checkpoint:
+            yield _cut(chunk, 0, until_checkpoint), True
+            chunk = _cut(chunk, until_checkpoint)
+            until_checkpoint = checkpoint_every
+        if _length(chunk):
+            until_checkpoint -= _length(chunk)
+            yield chunk, False
+
+def ingest(estimator, chunk, values=None):
+    if hasattr(estimator, "update_many"):
+        estimator.update_many(chunk, values)
+    elif values is None:
+        for k in chunk.tolist():
+            estimator.update(k, 1)
+    else:
+        for k, v in zip(chunk.tolist(), values.tolist()):
+            estimator.update(k, v)
+
+def query_many(estimator, keys):
+    if hasattr(estimator, "query_many"):
+        return np.asarray(estimator.query_many(keys), dtype=np.float64)
+    return np.fromiter((estimator.query(k) for k in keys.tolist()), dtype=np.float64, count=len(keys))
+
+def error_metrics(estimator, truth, k=None, packets=None):
+    # packets is given when the truth counts something else, e.g. bytes
+    if packets is None:
+        result = {"packets": truth.total, "keys": len(truth)}
+    else:
+        result = {"packets": packets, "bytes": truth.total, "keys": len(truth)}
+    result.update(summarize(truth.counts, query_many(estimator, truth.keys), k))
+    # hot-path counters, if the estimator is instrumented
+    result.update(estimator_stats(estimator))
+    return result
+
+def evaluate_stream(estimator, source, chunk_size=2**20, checkpoint_every=None, n=None, k=None, weighted=False):
+    # returns the ground truth and the metrics at every checkpoint_every
+    # packets and at the end of the stream, with weighted set the ground
+    # truth is the total size per key and rows also report the bytes
+    truth = KeyCounts()
+    checkpoints = []
+    packets = 0
+    chunks = as_chunks(source, chunk_size, n, weighted)
+    if checkpoint_every is None:
+        chunks = ((chunk, False) for chunk in chunks)
+    else:
+        chunks = split_at_checkpoints(chunks, checkpoint_every)
+    for chunk, at_checkpoint in chunks:
+        keys, values = chunk if weighted else (chunk, None)
+        if values is not None:
+            # uint32 sizes would overflow once summed
+            values = values.astype(np.int64)
+        ingest(estimator, keys, values)
+        truth.add(keys, values)
+        packets += len(keys)
+        if at_checkpoint:
+            checkpoints.append(error_metrics(estimator, truth, k, packets if weighted else None))
+    if len(truth) and (not checkpoints or checkpoints[-1]["packets"] != packets):
+        checkpoints.append(error_metrics(estimator, truth, k, packets if weighted else None))
+    return truth, checkpoints
@@ -0,0 +1,62 @@
+import csv
+from time import perf_counter
+
+from misc.counts import KeyCounts
+from estimators.instrumentation import instrument
+from evaluation.streaming import as_chunks, split_at_checkpoints, ingest, error_metrics
+
+# Run many estimator configurations over a stream in a single pass: every
+# chunk is read once, counted once for the ground truth and fed to all the
+# estimators while it is hot in cache. A configuration is a tuple
+# (name, factory, params) where factory(**params) builds the estimator.
+# The ground truth of the whole stream can be passed in, e.g. from the trace
+# count cache, in which case the chunks are not counted again. With stats
+# set the estimators are instrumented and their hot-path counters are added
+# to the rows, sample_every also times every n-th update.
+
+def sweep(source, configs, chunk_size=2**20, n=None, k=None, checkpoint_every=None, truth=None, stats=False, sample_every=0):
+    # returns one row per configuration and checkpoint
+    if truth is not None and checkpoint_every is not None:
+        raise ValueError("checkpoints need the ground truth of every prefix, do not pass truth")
+    counting = truth is None
+    estimators = [factory(**params) for _, factory, params in configs]
+    if stats:
+        estimators = [instrument(estimator, sample_every) for estimator in estimators]
+    ingest_seconds = [0.0] * len(configs)
+    truth = KeyCounts() if counting else truth
+    rows = []
+
+    def record():
+        for i, (name, _, params) in enumerate(configs):
+            row = {"estimator": name}
+            row.update(params)
+            row["ingest_seconds"] = ingest_seconds[i]
+            row.update(error_metrics(estimators[i], truth, k))
+            rows.append(row)
+
+    chunks = as_chunks(source, chunk_size, n)
+    if checkpoint_every is None:
+        chunks = ((chunk, False) for chunk in chunks)
+    else:
+        chunks = split_at_checkpoints(chunks, checkpoint_every)
+    for chunk, at_checkpoint in chunks:
+        if counting:
+            truth.add(chunk)
+        for i, estimator in enumerate(estimators):
+            t0 = perf_counter()
+            ingest(estimator, chunk)
+            ingest_seconds[i] += perf_counter() - t0
+        if at_checkpoint:
+            record()
+    if len(truth) and (not rows or rows[-1]["packets"] != truth.total):
+        record()
+    return rows
+
+def write_csv(rows, path):
+    columns = []
+    for row in rows:
+        columns.extend(c for c in row if c not in columns)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
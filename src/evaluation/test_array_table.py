@@ -0,0 +1,79 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import random
+import numpy as np
+
+from estimators.array_table import ArrayTable
+from estimators.rap import RandomAdmissionPolicy
+from estimators.mean_tail import MeanTail
+
+class TestArrayTable(unittest.TestCase):
+
+    def test_matches_dict(self):
+        # a power of two and an odd number of slots
+        for capacity in [16, 13]:
+            rng = random.Random(0)
+            table = ArrayTable(capacity)
+            reference = {}
+            for _ in range(20000):
+                key = rng.randrange(300)
+                if key in reference and rng.random() < 0.4:
+                    self.assertEqual(table.pop(key), reference.pop(key))
+                else:
+                    reference[key] = reference.get(key, 0) + 1
+                    table[key] = table.get(key, 0) + 1
+                self.assertEqual(len(table), len(reference))
+            self.assertEqual(dict(table.items()), reference)
+            for key in range(300):
+                self.assertEqual(key in table, key in reference)
+
+    def test_slots_are_not_rounded_up(self):
+        table = ArrayTable(3000)
+        self.assertEqual(table.slots, 4000)
+        for key in range(3000):
+            table[key] = key
+        self.assertEqual(table.slots, 4000)
+
+    def test_missing_key(self):
+        table = ArrayTable(4)
+        with self.assertRaises(KeyError):
+            table[1]
+        with self.assertRaises(KeyError):
+            del table[1]
+
+class TestArrayBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = np.random.default_rng(0).zipf(1.3, 10000) % 2000
+
+    def assert_backends_agree(self, factory):
+        estimates = []
+        for backend in ["dict", "array"]:
+            random.seed(0)
+            estimator = factory(backend)
+            estimator.update_many(self.stream)
+            estimates.append([estimator.query(k) for k in range(2000)])
+        self.assertEqual(estimates[0], estimates[1])
+
+    def test_rap(self):
+        self.assert_backends_agree(lambda backend: RandomAdmissionPolicy(128, backend))
+
+    def test_mean_tail(self):
+        self.assert_backends_agree(lambda backend: MeanTail(128, 0.125, backend))
+
+    def test_memory_usage(self):
+        # the array backend reports the bytes it holds
+        rap = RandomAdmissionPolicy(4096, backend="array")
+        self.assertEqual(rap.memory_usage(), rap.counters.nbytes)
+        self.assertLess(rap.memory_usage(), 40 * 4096)
+        mean_tail = MeanTail(4096, 0.125, backend="array")
+        self.assertEqual(mean_tail.memory_usage(),
+                         mean_tail.counters.nbytes + mean_tail.tail.nbytes + mean_tail.tail_index.nbytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import random
+import numpy as np
+
+from estimators.count_min import CountMin
+
+class TestCountMin(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = np.random.default_rng(0).zipf(1.3, 20000) % 5000
+        self.keys, self.counts = np.unique(self.stream, return_counts=True)
+
+    def test_initial_state(self):
+        self.assertEqual(CountMin(100, 4, seed=0).query(1), 0, "Initial counter value should be 0")
+
+    def test_update_matches_update_many(self):
+        cm = CountMin(256, 4, seed=0)
+        for k in self.stream[:2000].tolist():
+            cm.update(k, 1)
+        cm_many = CountMin(256, 4, seed=0)
+        cm_many.update_many(self.stream[:2000])
+        np.testing.assert_array_equal(cm.table, cm_many.table)
+
+    def test_never_underestimates(self):
+        for conservative in [False, True]:
+            cm = CountMin(512, 4, seed=0, conservative=conservative)
+            for chunk in np.array_split(self.stream, 10):
+                cm.update_many(chunk)
+            self.assertTrue(np.all(cm.query_many(self.keys) >= self.counts))
+
+    def test_conservative_update_is_tighter(self):
+        cm = CountMin(512, 4, seed=0)
+        cu = CountMin(512, 4, seed=0, conservative=True)
+        for chunk in np.array_split(self.stream, 10):
+            cm.update_many(chunk)
+            cu.update_many(chunk)
+        self.assertTrue(np.all(cu.query_many(self.keys) <= cm.query_many(self.keys)))
+
+    def test_reproducible_with_seed(self):
+        a = CountMin(128, 3, seed=7)
+        b = CountMin(128, 3, seed=7)
+        a.update_many(self.stream)
+        b.update_many(self.stream)
+        np.testing.assert_array_equal(a.table, b.table)
+
+    def test_global_seed(self):
+        # seed=None follows random.seed, so unseeded sketches still merge
+        random.seed(3)
+        a = CountMin(128, 3)
+        random.seed(3)
+        b = CountMin(128, 3)
+        a.update_many(self.stream[:10000])
+        b.update_many(self.stream[10000:])
+        expected = a.table + b.table
+        a.merge(b)
+        np.testing.assert_array_equal(a.table, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
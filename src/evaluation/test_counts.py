@@ -0,0 +1,50 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import tempfile
+from collections import Counter
+import numpy as np
+
+from misc.counts import trace_counts, cached_prefixes, counts_path
+
+class TestTraceCounts(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "test.trace")
+        self.keys = np.random.default_rng(0).zipf(1.5, 5000).tolist()
+        with open(self.path, "w") as f:
+            f.write("\n".join(str(k) for k in self.keys) + "\n")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def assertCounts(self, counts, n):
+        expected = Counter(self.keys[:n])
+        self.assertEqual(counts.keys.tolist(), sorted(expected))
+        self.assertEqual(counts.counts.tolist(), [expected[k] for k in sorted(expected)])
+        self.assertEqual(counts.total, n)
+
+    def test_prefixes(self):
+        for n in [1000, 3000, 2000, None]:
+            self.assertCounts(trace_counts(self.path, n), len(self.keys) if n is None else n)
+        self.assertEqual(cached_prefixes(self.path), [1000, 2000, 3000, len(self.keys)])
+        with self.assertRaises(ValueError):
+            trace_counts(self.path, len(self.keys) + 1)
+
+    def test_cache_is_reused(self):
+        trace_counts(self.path, 2500)
+        mtime = os.path.getmtime(counts_path(self.path, 2500))
+        self.assertCounts(trace_counts(self.path, 2500), 2500)
+        self.assertEqual(os.path.getmtime(counts_path(self.path, 2500)), mtime)
+
+    def test_rank_frequencies(self):
+        frequencies = trace_counts(self.path).rank_frequencies()
+        self.assertEqual(frequencies.tolist(), sorted(Counter(self.keys).values(), reverse=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+
+import misc.distribution as dist
+
+class TestDistribution(unittest.TestCase):
+
+    def distributions(self, rng):
+        # rng() is called once per distribution
+        return [
+            dist.NormalDistribution(1000, rng=rng()),
+            dist.UniformDistribution(1000, rng=rng()),
+            dist.ExponentialDistribution(1000, rng=rng()),
+            dist.ZipfianDistribution(1000, 1.2, rng=rng()),
+        ]
+
+    def test_probabilities(self):
+        for d in self.distributions(lambda: 0):
+            probabilities = d.probability(np.arange(1000))
+            self.assertAlmostEqual(probabilities.sum(), 1.0)
+            self.assertTrue(np.all(np.diff(probabilities) <= 0))
+            self.assertEqual(d.probability(3), probabilities[3])
+        zipf = dist.ZipfianDistribution(10, 2.0)
+        harmonic = sum(1 / k**2 for k in range(1, 11))
+        self.assertAlmostEqual(zipf.probability(0), 1 / harmonic)
+        self.assertAlmostEqual(zipf.probability(9), 1 / 100 / harmonic)
+
+    def test_reproducible_chunks(self):
+        for d, same in zip(self.distributions(lambda: 7), self.distributions(lambda: np.random.default_rng(7))):
+            stream = np.concatenate(list(d.generate_chunks(10000, chunk=3000)))
+            self.assertEqual(len(stream), 10000)
+            self.assertTrue(np.all(stream < 1000))
+            np.testing.assert_array_equal(stream, same.generate(10000))
+
+    def test_global_seed(self):
+        # without rng the Generator follows np.random.seed()
+        np.random.seed(3)
+        first = [d.generate(100) for d in self.distributions(lambda: None)]
+        np.random.seed(3)
+        second = [d.generate(100) for d in self.distributions(lambda: None)]
+        for a, b in zip(first, second):
+            np.testing.assert_array_equal(a, b)
+
+    def test_empirical_frequencies(self):
+        d = dist.ZipfianDistribution(100, 1.5, rng=1)
+        counts = np.bincount(d.generate(200000).astype(np.int64), minlength=100)
+        np.testing.assert_allclose(counts / 200000, d.probability(np.arange(100)), atol=0.005)
+
+
+if __name__ == '__main__':
+    unittest.main()
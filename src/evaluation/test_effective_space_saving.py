@@ -0,0 +1,62 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+
+from estimators.effective_space_saving import EffectiveSpaceSaving, CandidateWindow
+
+class TestEffectiveSpaceSaving(unittest.TestCase):
+
+    def test_flush_promotes_largest_candidate(self):
+        ess = EffectiveSpaceSaving(4, 0.5, seed=0)
+        for key in [1, 1, 2, 3, 3, 3, 4]:
+            ess.update(key, 1)
+        self.assertEqual((ess.query(1), ess.query(2)), (2, 1))
+        self.assertEqual(dict(ess.candidates.items()), {3: 3, 4: 1})
+        ess.update(5, 1)
+        # 3 takes the place of 2, adding its count
+        self.assertEqual((ess.query(3), ess.query(2)), (4, 0))
+        self.assertNotIn(3, ess.candidates)
+
+    def test_flush_survival_probability(self):
+        # candidates [100, 1, 1, 1]: the small ones survive with 1 / 103
+        survived = 0
+        trials = 20000
+        for seed in range(trials):
+            ess = EffectiveSpaceSaving(8, 0.5, seed=seed)
+            for key in range(4):
+                ess.update(key, 1000)
+            ess.update(10, 100)
+            for key in [11, 12, 13]:
+                ess.update(key, 1)
+            ess.update(14, 1)
+            survived += len(ess.candidates)
+        self.assertAlmostEqual(survived / (3 * trials), 1 / 103, delta=0.003)
+
+    def test_window_running_sum_and_max(self):
+        rng = np.random.default_rng(0)
+        window = CandidateWindow(64)
+        for key, value in zip(rng.permutation(64).tolist(), rng.integers(1, 10, 64).tolist()):
+            window.insert(key, value)
+        for _ in range(5):
+            window.thin(rng)
+            values = window.values[:len(window)]
+            self.assertEqual(window.total, values.sum())
+            if len(window):
+                self.assertEqual(values[window.max_slot], values.max())
+                self.assertEqual({k: window.get(k) for k in window.slot}, dict(window.items()))
+
+    def test_seed_is_reproducible(self):
+        stream = np.random.default_rng(1).zipf(1.2, 20000) % 5000
+        first, second = EffectiveSpaceSaving(200, 0.25, seed=3), EffectiveSpaceSaving(200, 0.25, seed=3)
+        first.update_many(stream)
+        for key in stream.tolist():
+            second.update(key, 1)
+        self.assertEqual(dict(first.counters.items()), dict(second.counters.items()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+
+from evaluation.fit_zipfian import (fit_power_law, fit_lognormal, fit_zipfian, fit_frequencies,
+                                    log_binned_ranks, lognormal_fit, PrefixFitter)
+
+class TestFitZipfian(unittest.TestCase):
+
+    def test_exact_curves(self):
+        rank = np.arange(1, 5001)
+        a, b = fit_power_law(rank, 0.3 * rank ** -1.2)
+        self.assertAlmostEqual(a, 0.3, places=4)
+        self.assertAlmostEqual(b, 1.2, places=4)
+        s, scale = fit_lognormal(rank, lognormal_fit(rank, 1.5, 2.0))
+        self.assertAlmostEqual(s, 1.5)
+        self.assertAlmostEqual(scale, 2.0)
+
+    def test_zipf_mle(self):
+        counts = np.sort(np.unique(np.random.default_rng(0).zipf(1.5, 200000), return_counts=True)[1])[::-1]
+        rank = np.arange(1, len(counts) + 1)
+        a = fit_zipfian(rank, counts / counts.sum(), counts)
+        self.assertAlmostEqual(a, 1.5, delta=0.1)
+
+    def test_log_binned_ranks(self):
+        self.assertEqual(log_binned_ranks(10).tolist(), list(range(1, 11)))
+        ranks = log_binned_ranks(10**6, 100)
+        self.assertEqual((ranks[0], ranks[-1]), (1, 10**6))
+        self.assertLessEqual(len(ranks), 100)
+
+    def test_prefix_fitter(self):
+        stream = np.random.default_rng(1).zipf(1.3, 30000).astype(np.uint64)
+        fitter = PrefixFitter(bins=500)
+        for start in range(0, len(stream), 10000):
+            params = fitter.extend(stream[start:start + 10000])
+        counts = np.unique(stream, return_counts=True)[1]
+        expected = fit_frequencies(np.sort(counts)[::-1], bins=500)
+        self.assertAlmostEqual(params["Zipfian"], expected["Zipfian"], places=3)
+        np.testing.assert_allclose(params["Power Law"], expected["Power Law"], rtol=1e-3)
+        np.testing.assert_allclose(params["Log-normal"], expected["Log-normal"])
+        self.assertEqual(set(params["SSR"]), {"Zipfian", "Power Law", "Log-normal"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+
+from estimators.frequent import Frequent, BatchedFrequent
+from misc.counts import KeyCounts
+
+class DictFrequent:
+    # weighted Misra-Gries, decrementing every counter explicitly
+    def __init__(self, size):
+        self.size = size
+        self.counters = {}
+
+    def update(self, index, value):
+        if index in self.counters:
+            self.counters[index] += value
+            return
+        if len(self.counters) >= self.size:
+            decrement = min(value, min(self.counters.values()))
+            self.counters = {k: c - decrement for k, c in self.counters.items() if c > decrement}
+            value -= decrement
+        if value > 0:
+            self.counters[index] = value
+
+class TestFrequent(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.stream = (rng.zipf(1.3, 20000) % 2000).astype(np.uint64)
+        self.values = rng.integers(1, 5, len(self.stream))
+        self.truth = KeyCounts()
+        self.truth.add(self.stream)
+
+    def test_absent_key_is_zero(self):
+        fr = Frequent(2)
+        for key in [1, 1, 1, 2, 3, 4]:
+            fr.update(key, 1)
+        self.assertEqual((fr.query(1), fr.query(3), fr.query(4)), (2, 0, 1))
+        self.assertEqual(fr.query(5), 0)
+        self.assertEqual(BatchedFrequent(2).query(5), 0)
+
+    def test_decrement_drops_new_key(self):
+        fr = Frequent(2)
+        for key in [1, 1, 2, 3]:
+            fr.update(key, 1)
+        self.assertEqual((fr.query(1), fr.query(2), fr.query(3)), (1, 0, 0))
+        self.assertEqual(len(fr.counters), 1)
+
+    def test_same_as_dict(self):
+        for values in [None, self.values]:
+            fr, reference = Frequent(50), DictFrequent(50)
+            for i, key in enumerate(self.stream[:5000].tolist()):
+                value = 1 if values is None else int(values[i])
+                fr.update(key, value)
+                reference.update(key, value)
+            self.assertEqual({k: fr.query(k) for k in fr.counters.keys()}, reference.counters)
+
+    def assert_bounds(self, estimator, size):
+        estimates = np.array([estimator.query(k) for k in self.truth.keys.tolist()])
+        self.assertTrue(np.all(estimates <= self.truth.counts))
+        self.assertTrue(np.all(estimates >= self.truth.counts - len(self.stream) / (size + 1)))
+
+    def test_error_bound(self):
+        fr = Frequent(100)
+        fr.update_many(self.stream)
+        self.assertLessEqual(len(fr.counters), 100)
+        self.assert_bounds(fr, 100)
+
+    def test_batched_error_bound(self):
+        fr = BatchedFrequent(100)
+        for chunk in range(0, len(self.stream), 1000):
+            fr.update_many(self.stream[chunk:chunk + 1000])
+        self.assertLessEqual(len(fr.keys), 100)
+        self.assert_bounds(fr, 100)
+        np.testing.assert_array_equal(fr.query_many(self.truth.keys),
+                                      [fr.query(k) for k in self.truth.keys.tolist()])
+
+    def test_batched_merge(self):
+        halves = [BatchedFrequent(100), BatchedFrequent(100)]
+        halves[0].update_many(self.stream[:12000])
+        halves[1].update_many(self.stream[12000:])
+        self.assert_bounds(halves[0].merge(halves[1]), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import random
+import numpy as np
+
+from estimators.space_saving import SpaceSaving
+from estimators.rap import RandomAdmissionPolicy
+from estimators.mean_tail import MeanTail
+from estimators.frequent import BatchedFrequent
+from estimators.windowed import JumpingWindow
+from estimators.instrumentation import instrument, uninstrument, estimator_stats, BRANCHES
+from evaluation.sweep import sweep
+from evaluation.factories import estimator_factories
+
+FACTORIES = [factory for factory in estimator_factories(64, seed=None) if factory.func in BRANCHES]
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = np.random.default_rng(0).zipf(1.2, 5000).astype(np.uint64)
+
+    def test_same_estimates(self):
+        keys = np.unique(self.stream).tolist()
+        for factory in FACTORIES:
+            random.seed(1)
+            plain = factory()
+            plain.update_many(self.stream)
+            random.seed(1)
+            instrumented = instrument(factory(), sample_every=10)
+            instrumented.update_many(self.stream)
+            self.assertIsInstance(instrumented, type(plain))
+            self.assertEqual([plain.query(k) for k in keys], [instrumented.query(k) for k in keys])
+            stats = instrumented.stats
+            self.assertEqual(stats["updates"], len(self.stream))
+            timed = sum(count for name, count in stats.items() if name.endswith(".timed"))
+            self.assertEqual(timed, len(self.stream) // 10)
+            self.assertIs(type(uninstrument(instrumented)), type(plain))
+            self.assertEqual(estimator_stats(instrumented), {})
+
+    def test_branches(self):
+        random.seed(2)
+        mt = instrument(MeanTail(64, 0.25))
+        mt.update_many(self.stream)
+        stats = mt.stats
+        branches = ["counter_hit", "tail_hit", "tail_promote", "fill_counters", "fill_tail", "admit_tail", "reject"]
+        self.assertEqual(sum(stats[b] for b in branches), len(self.stream))
+        self.assertEqual(stats["fill_counters"], mt.counters_size)
+        self.assertEqual(stats["fill_tail"], mt.tail_size)
+        self.assertEqual(stats["tail_promote"], stats["promotions_to_counters"])
+
+    def test_unsupported(self):
+        for estimator in [BatchedFrequent(64), JumpingWindow(lambda: SpaceSaving(64), 1000)]:
+            with self.assertRaises(TypeError):
+                instrument(estimator)
+
+    def test_sweep_rows(self):
+        configs = [("RAP", lambda size: RandomAdmissionPolicy(size), {"size": 64})]
+        row = sweep(self.stream, configs, stats=True)[0]
+        self.assertEqual(row["stats.updates"], len(self.stream))
+        self.assertEqual(row["stats.hit"] + row["stats.fill"] + row["stats.admit"] + row["stats.reject"], len(self.stream))
+        self.assertNotIn("stats.updates", sweep(self.stream, configs)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
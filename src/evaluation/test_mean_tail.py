@@ -0,0 +1,39 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import random
+import numpy as np
+
+from estimators.mean_tail import MeanTail
+
+class TestMeanTail(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        self.mt = MeanTail(100, 0.1)
+
+    def test_initial_state(self):
+        self.assertEqual(self.mt.query(1), 0, "Initial counter value should be 0")
+
+    def test_fill_counters_then_tail(self):
+        for k in range(self.mt.counters_size + self.mt.tail_size):
+            self.mt.update(k, 1)
+        self.assertEqual(self.mt.query(0), 1)
+        self.assertEqual(self.mt.tail, list(range(self.mt.counters_size, self.mt.counters_size + self.mt.tail_size)))
+        self.assertEqual(self.mt.tail_average(), 1)
+        self.assertEqual(self.mt.query(self.mt.tail[-1]), 1, "Tail keys should be estimated by the tail average")
+
+    def test_tail_index_stays_consistent(self):
+        stream = (np.random.default_rng(0).zipf(1.3, 20000) % 3000).tolist()
+        for k in stream:
+            self.mt.update(k, 1)
+        self.assertEqual(len(self.mt.tail), self.mt.tail_size)
+        self.assertEqual(self.mt.tail_index, {k: slot for slot, k in enumerate(self.mt.tail)})
+        self.assertFalse(set(self.mt.tail_index) & set(self.mt.counters.keys()), "A key should not be both in the tail and the counters")
+
+
+if __name__ == '__main__':
+    unittest.main()
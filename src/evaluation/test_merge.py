@@ -0,0 +1,108 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import pickle
+import tempfile
+import random
+from functools import partial
+import numpy as np
+
+from estimators.space_saving import SpaceSaving
+from estimators.rap import RandomAdmissionPolicy
+from estimators.mean_tail import MeanTail
+from estimators.frequent import Frequent
+from estimators.count_min import CountMin
+from estimators.stream_summary import StreamSummary
+from misc.counts import KeyCounts
+from evaluation.parallel import parallel_ingest, shard_of
+
+class TestMerge(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        self.stream = np.random.default_rng(0).zipf(1.2, 40000).astype(np.uint64)
+        self.truth = KeyCounts()
+        self.truth.add(self.stream)
+        self.halves = self.stream[:25000], self.stream[25000:]
+
+    def merged(self, factory, halves=None):
+        estimators = []
+        for half in halves or self.halves:
+            estimator = factory()
+            estimator.update_many(half)
+            estimators.append(estimator)
+        return estimators[0].merge(estimators[1])
+
+    def heavy_hitters(self, count=20):
+        return self.truth.keys[np.argsort(self.truth.counts)[::-1][:count]].tolist()
+
+    def test_count_min(self):
+        merged = self.merged(partial(CountMin, 128, 4, seed=1))
+        whole = CountMin(128, 4, seed=1)
+        whole.update_many(self.stream)
+        np.testing.assert_array_equal(merged.table, whole.table)
+        with self.assertRaises(ValueError):
+            merged.merge(CountMin(128, 4, seed=2))
+
+    def test_space_saving(self):
+        size = 200
+        merged = self.merged(partial(SpaceSaving, size))
+        self.assertEqual(len(merged.counters), size)
+        for key, count in merged.counters.items():
+            true = int(self.truth.get([key])[0])
+            self.assertGreaterEqual(count, true)
+            self.assertLessEqual(count, true + len(self.stream) / size)
+        for key in self.heavy_hitters():
+            self.assertIn(key, merged.counters)
+
+    def test_frequent(self):
+        size = 200
+        merged = self.merged(partial(Frequent, size))
+        self.assertLessEqual(len(merged.counters), size)
+        for key, true in zip(self.truth.keys.tolist(), self.truth.counts.tolist()):
+            self.assertLessEqual(merged.query(key), true)
+            self.assertGreaterEqual(merged.query(key), true - len(self.stream) / (size + 1))
+
+    def test_rap_and_mean_tail(self):
+        for factory in [partial(RandomAdmissionPolicy, 200), partial(RandomAdmissionPolicy, 200, backend="array"),
+                        partial(MeanTail, 200, 0.25), partial(MeanTail, 200, 0.25, backend="array")]:
+            merged = self.merged(factory)
+            counters_size = getattr(merged, "counters_size", getattr(merged, "size", None))
+            self.assertEqual(len(merged.counters), counters_size)
+            for key in self.heavy_hitters(10):
+                true = int(self.truth.get([key])[0])
+                self.assertAlmostEqual(merged.query(key), true, delta=0.2 * true)
+        mt = self.merged(partial(MeanTail, 200, 0.25))
+        self.assertEqual(len(mt.tail_index), mt.tail_size)
+        self.assertTrue(all(mt.tail[slot] == key for key, slot in mt.tail_index.items()))
+
+    def test_pickle_stream_summary(self):
+        summary = StreamSummary()
+        for key in range(5000):
+            summary.insert(key, key % 2000)
+        copy = pickle.loads(pickle.dumps(summary))
+        self.assertEqual(sorted(copy.items()), sorted(summary.items()))
+        self.assertEqual(copy.pop_min(), summary.pop_min())
+
+    def test_parallel_ingest(self):
+        whole = CountMin(128, 4, seed=1)
+        whole.update_many(self.stream)
+        for how in ["hash", "round_robin"]:
+            merged = parallel_ingest(partial(CountMin, 128, 4, seed=1), self.stream, 3, max_workers=2,
+                                     chunk_size=5000, how=how)
+            np.testing.assert_array_equal(merged.table, whole.table)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.trace")
+            with open(path, "w") as f:
+                f.write("\n".join(map(str, self.stream.tolist())) + "\n")
+            merged = parallel_ingest(partial(SpaceSaving, 200), path, 2, chunk_size=5000, n=30000)
+        shards = [self.stream[:30000][shard_of(self.stream[:30000], 2) == shard] for shard in range(2)]
+        expected = self.merged(partial(SpaceSaving, 200), shards)
+        self.assertEqual(sorted(merged.counters.items()), sorted(expected.counters.items()))
+
+
+if __name__ == '__main__':
+    unittest.main()
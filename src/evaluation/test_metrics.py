@@ -0,0 +1,45 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+
+from evaluation import metrics
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # distinct true counts so that the top-k is unambiguous
+        self.actual = rng.permutation(np.arange(1, 1001))
+        self.estimated = np.where(rng.random(1000) < 0.3, 0, self.actual + rng.integers(0, 5, 1000))
+
+    def test_errors(self):
+        errors = [e - a for a, e in zip(self.actual.tolist(), self.estimated.tolist())]
+        self.assertAlmostEqual(metrics.mse(self.actual, self.estimated), np.mean([e ** 2 for e in errors]))
+        self.assertAlmostEqual(metrics.aae(self.actual, self.estimated), np.mean([abs(e) for e in errors]))
+        self.assertAlmostEqual(metrics.are(self.actual, self.estimated), np.mean([abs(e) / a for e, a in zip(errors, self.actual.tolist())]))
+        self.assertAlmostEqual(metrics.weighted_are(self.actual, self.estimated), sum(abs(e) for e in errors) / self.actual.sum())
+
+    def test_recall_at_k(self):
+        k = 100
+        top = sorted(range(1000), key=lambda i: -self.actual[i])[:k]
+        expected = sum(1 for i in top if self.estimated[i] > 0) / k
+        self.assertAlmostEqual(metrics.recall_at_k(self.actual, self.estimated, k), expected)
+
+    def test_precision_at_k(self):
+        k = 100
+        true_top = set(sorted(range(1000), key=lambda i: -self.actual[i])[:k])
+        self.assertEqual(metrics.precision_at_k(self.actual, self.actual, k), 1)
+        estimated_top = metrics.top_k(self.estimated, k)
+        expected = len(true_top & set(estimated_top.tolist())) / k
+        self.assertAlmostEqual(metrics.precision_at_k(self.actual, self.estimated, k), expected)
+
+    def test_top_k_larger_than_input(self):
+        self.assertEqual(len(metrics.top_k(self.actual, 5000)), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
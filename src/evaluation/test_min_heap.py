@@ -0,0 +1,86 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import random
+import numpy as np
+
+from estimators.min_heap import IndexedMinHeap
+from estimators.rap import RandomAdmissionPolicy
+
+class DictRandomAdmissionPolicy:
+    def __init__(self, size, rng):
+        self.size = size
+        self.counters = {}
+        self.rng = rng
+
+    def update(self, index, value):
+        if index in self.counters:
+            self.counters[index] += value
+        else:
+          if len(self.counters) < self.size:
+            self.counters[index] = value
+          else:
+            min_counter_index = min(self.counters, key=self.counters.get)
+            min_counter = self.counters[min_counter_index]
+            thresh = 1 / (min_counter + 1)
+            if self.rng.random() < thresh:
+              del self.counters[min_counter_index]
+              self.counters[index] = min_counter + value
+
+class TestIndexedMinHeap(unittest.TestCase):
+
+    def test_matches_dict_min(self):
+        for backend in ["dict", "array"]:
+            self.assert_matches_dict_min(IndexedMinHeap(200, backend))
+
+    def test_sequence_numbers_wrap(self):
+        # uint32 sequence numbers are renumbered in order when they run out
+        heap = IndexedMinHeap(200, "array")
+        heap.next_seq = heap.seq_limit - 1000
+        self.assert_matches_dict_min(heap)
+        self.assertLess(heap.next_seq, 10000)
+
+    def assert_matches_dict_min(self, heap):
+        rng = random.Random(0)
+        reference = {}
+        for _ in range(5000):
+            key = rng.randrange(200)
+            op = rng.random()
+            if key in reference and op < 0.2:
+                heap.remove(key)
+                del reference[key]
+            elif key in reference:
+                delta = rng.randrange(-3, 4)
+                heap.increment(key, delta)
+                reference[key] += delta
+            elif reference and op < 0.5:
+                min_key = min(reference, key=reference.get)
+                del reference[min_key]
+                reference[key] = rng.randrange(10)
+                heap.replace_min(key, reference[key])
+            else:
+                reference[key] = rng.randrange(10)
+                heap.insert(key, reference[key])
+            min_key = min(reference, key=reference.get)
+            self.assertEqual(heap.peek_min(), (min_key, reference[min_key]))
+            self.assertEqual(dict(heap.items()), reference)
+
+class TestRandomAdmissionPolicy(unittest.TestCase):
+
+    def test_matches_dict_implementation(self):
+        stream = (np.random.default_rng(0).zipf(1.3, 20000) % 3000).tolist()
+        for size in [1, 16, 256]:
+            rap = RandomAdmissionPolicy(size, seed=size)
+            reference = DictRandomAdmissionPolicy(size, random.Random(size))
+            for k in stream:
+                rap.update(k, 1)
+            for k in stream:
+                reference.update(k, 1)
+            self.assertEqual(dict(rap.counters.items()), reference.counters)
+
+
+if __name__ == '__main__':
+    unittest.main()
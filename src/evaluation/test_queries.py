@@ -0,0 +1,57 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+
+from evaluation.factories import estimator_factories, ingested
+
+# CountMin keeps no keys, so it has no items, top_k or heavy_hitters
+FACTORIES = [factory for factory in estimator_factories(100) if hasattr(factory.func, "top_k")]
+
+class TestQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = (np.random.default_rng(0).zipf(1.3, 20000) % 3000).astype(np.uint64)
+        self.keys = np.unique(self.stream)
+
+    def estimators(self):
+        return ingested(FACTORIES, self.stream)
+
+    def test_items_match_query(self):
+        for estimator in self.estimators():
+            items = dict(estimator.items())
+            self.assertTrue(items)
+            for key, estimate in items.items():
+                self.assertEqual(estimate, estimator.query(key))
+
+    def test_query_many(self):
+        for estimator in self.estimators():
+            estimates = estimator.query_many(self.keys)
+            self.assertIsInstance(estimates, np.ndarray)
+            np.testing.assert_array_equal(estimates, [estimator.query(k) for k in self.keys.tolist()])
+
+    def test_top_k(self):
+        for estimator in self.estimators():
+            ranked = sorted((estimate for _, estimate in estimator.items()), reverse=True)
+            for k in [0, 1, 10, 1000]:
+                top = estimator.top_k(k)
+                self.assertEqual([estimate for _, estimate in top], ranked[:k])
+                self.assertEqual(len(set(key for key, _ in top)), len(top))
+                for key, estimate in top:
+                    self.assertEqual(estimator.query(key), estimate)
+
+    def test_heavy_hitters(self):
+        for estimator in self.estimators():
+            items = dict(estimator.items())
+            for threshold in [1, 5, 50]:
+                hitters = estimator.heavy_hitters(threshold)
+                self.assertEqual(dict(hitters), {k: v for k, v in items.items() if v >= threshold})
+                estimates = [estimate for _, estimate in hitters]
+                self.assertEqual(estimates, sorted(estimates, reverse=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import tempfile
+from functools import partial
+import numpy as np
+
+from estimators.space_saving import SpaceSaving
+from estimators.count_min import CountMin
+from evaluation.scheduler import run_tasks
+from evaluation.results import ResultStore
+from evaluation.sweep import sweep
+
+def failing_factory(**params):
+    raise RuntimeError("stored results should not be recomputed")
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.trace_file = os.path.join(self.dir.name, "test.trace")
+        self.trace = np.random.default_rng(0).zipf(1.3, 20000)
+        with open(self.trace_file, "w") as f:
+            f.write("\n".join(str(k) for k in self.trace.tolist()) + "\n")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_matches_sweep(self):
+        configs = [
+            ("SS", SpaceSaving, {"size": 64}),
+            ("SS", SpaceSaving, {"size": 256}),
+            ("CM", partial(CountMin, depth=4, seed=0), {"width": 128}),
+        ]
+        tasks = [
+            {"trace": self.trace_file, "n": 15000, "estimator": name, "factory": factory, "params": params, "seed": 0}
+            for name, factory, params in configs
+        ]
+        store = ResultStore(os.path.join(self.dir.name, "results.sqlite"))
+        rows = run_tasks(tasks, store, max_workers=2, chunk_size=4000, k=20)
+        self.assertEqual(len(rows), len(tasks))
+        self.assertEqual(sorted(map(str, store.rows())), sorted(map(str, rows)))
+        # a second run only reads the stored results
+        for task in tasks:
+            task["factory"] = failing_factory
+        self.assertEqual(run_tasks(tasks, store, max_workers=2, k=20), rows)
+        store.close()
+        expected = sweep(self.trace[:15000], configs, k=20)
+        key = lambda row: (row["estimator"], row.get("size", row.get("width")))
+        rows = sorted(rows, key=key)
+        for row, expected_row in zip(rows, sorted(expected, key=key)):
+            for metric in ["packets", "mse", "are", "recall"]:
+                self.assertAlmostEqual(row[metric], expected_row[metric])
+
+
+if __name__ == '__main__':
+    unittest.main()
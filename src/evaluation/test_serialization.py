@@ -0,0 +1,96 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import pickle
+import tempfile
+import random
+import numpy as np
+
+from estimators.space_saving import SpaceSaving
+from estimators.mean_tail import MeanTail
+from estimators.effective_space_saving import EffectiveSpaceSaving
+from estimators.count_min import CountMin
+from estimators.serialization import from_bytes, snapshot, restore, pack, unpack, VERSION
+from evaluation.factories import estimator_factories
+
+FACTORIES = estimator_factories(64)
+
+class TestSerialization(unittest.TestCase):
+
+    def setUp(self):
+        stream = np.random.default_rng(0).zipf(1.2, 20000).astype(np.uint64)
+        self.first, self.second = stream[:10000], stream[10000:]
+        self.keys = np.unique(stream).tolist()
+
+    def assert_continues(self, original, restored):
+        # a restored estimator continues exactly like the original
+        self.assertIs(type(restored), type(original))
+        self.assertEqual([restored.query(k) for k in self.keys], [original.query(k) for k in self.keys])
+        original.update_many(self.second)
+        restored.update_many(self.second)
+        self.assertEqual([restored.query(k) for k in self.keys], [original.query(k) for k in self.keys])
+
+    def test_bytes(self):
+        for factory in FACTORIES:
+            original = factory()
+            original.update_many(self.first)
+            data = original.to_bytes()
+            self.assert_continues(original, type(original).from_bytes(data))
+        with self.assertRaises(ValueError):
+            SpaceSaving.from_bytes(FACTORIES[-1]().to_bytes())
+
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for i, factory in enumerate(FACTORIES):
+                original = factory()
+                original.update_many(self.first)
+                path = os.path.join(directory, f"{i}.sketch")
+                snapshot(original, path)
+                self.assert_continues(original, restore(path))
+            # array state is used in place, updates do not touch the file
+            sketch = CountMin(64, 4, seed=1)
+            sketch.update_many(self.first)
+            path = os.path.join(directory, "cm.sketch")
+            snapshot(sketch, path)
+            restored = restore(path)
+            self.assertFalse(restored.table.flags.owndata)
+            restored.update_many(self.second)
+            np.testing.assert_array_equal(restore(path).table, CountMin.from_bytes(sketch.to_bytes()).table)
+
+    def test_effective_space_saving(self):
+        random.seed(0)
+        ess = EffectiveSpaceSaving(64, 0.25)
+        ess.update_many(self.first)
+        restored = from_bytes(ess.to_bytes())
+        self.assertEqual(dict(restored.counters.items()), dict(ess.counters.items()))
+        self.assertEqual(dict(restored.candidates.items()), dict(ess.candidates.items()))
+        self.assert_continues(ess, restored)
+
+    def test_format(self):
+        data = pack("Test", {"a": 1}, {"x": np.arange(5, dtype=np.int32), "y": np.ones((2, 3))})
+        kind, meta, arrays = unpack(data)
+        self.assertEqual((kind, meta), ("Test", {"a": 1}))
+        np.testing.assert_array_equal(arrays["x"], np.arange(5))
+        self.assertEqual(arrays["y"].shape, (2, 3))
+        newer = bytearray(data)
+        newer[8:12] = (VERSION + 1).to_bytes(4, "little")
+        with self.assertRaises(ValueError):
+            unpack(bytes(newer))
+        older = bytearray(data)
+        older[8:12] = (VERSION - 1).to_bytes(4, "little")
+        with self.assertRaises(ValueError):
+            unpack(bytes(older))
+        with self.assertRaises(ValueError):
+            unpack(b"not a sketch" + bytes(20))
+
+    def test_pickle_keeps_rng(self):
+        mt = MeanTail(64, 0.25, seed=3)
+        mt.update_many(self.first)
+        self.assert_continues(mt, pickle.loads(pickle.dumps(mt)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+
+from estimators.space_saving import SpaceSaving
+
+class DictSpaceSaving:
+    def __init__(self, size):
+        self.size = size
+        self.counters = {}
+
+    def update(self, index, value):
+        if index in self.counters:
+            self.counters[index] += value
+        else:
+            if len(self.counters) >= self.size:
+                index_smallest = min(self.counters, key=self.counters.get)
+                self.counters[index] = self.counters[index_smallest] + value
+                del self.counters[index_smallest]
+            else:
+                self.counters[index] = value
+
+class TestSpaceSaving(unittest.TestCase):
+
+    def test_initial_state(self):
+        self.assertEqual(SpaceSaving(10).query(1), 0, "Initial counter value should be 0")
+
+    def test_eviction_replaces_minimum(self):
+        ss = SpaceSaving(2)
+        ss.update(1, 1)
+        ss.update(1, 1)
+        ss.update(2, 1)
+        ss.update(3, 1)
+        self.assertEqual(ss.query(1), 2)
+        self.assertEqual(ss.query(2), 0, "Minimum counter should be evicted")
+        self.assertEqual(ss.query(3), 2, "New key should inherit the minimum count")
+
+    def test_matches_dict_implementation(self):
+        rng = np.random.default_rng(0)
+        stream = (rng.zipf(1.3, 20000) % 3000).tolist()
+        for size in [1, 7, 64, 500]:
+            ss = SpaceSaving(size)
+            reference = DictSpaceSaving(size)
+            for k in stream:
+                ss.update(k, 1)
+                reference.update(k, 1)
+            self.assertEqual(dict(ss.counters.items()), reference.counters)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+from collections import Counter
+import numpy as np
+
+from misc.counts import KeyCounts
+from estimators.space_saving import SpaceSaving
+from evaluation.streaming import evaluate_stream
+
+class TestKeyCounts(unittest.TestCase):
+
+    def test_matches_counter(self):
+        stream = np.random.default_rng(0).zipf(1.3, 10000).astype(np.uint64)
+        counts = KeyCounts()
+        for chunk in np.array_split(stream, 7):
+            counts.add(chunk)
+        expected = Counter(stream.tolist())
+        self.assertEqual(dict(zip(counts.keys.tolist(), counts.counts.tolist())), expected)
+        self.assertEqual(counts.total, len(stream))
+        self.assertEqual(counts.get([stream[0], 10**12]).tolist(), [expected[int(stream[0])], 0])
+        self.assertEqual(counts.rank_frequencies().tolist(), sorted(expected.values(), reverse=True))
+
+class TestEvaluateStream(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = np.random.default_rng(0).zipf(1.3, 10000).astype(np.uint64)
+
+    def test_checkpoints(self):
+        truth, checkpoints = evaluate_stream(SpaceSaving(100), self.stream, chunk_size=3000, checkpoint_every=4000)
+        self.assertEqual([c["packets"] for c in checkpoints], [4000, 8000, 10000])
+        self.assertEqual(truth.total, len(self.stream))
+
+    def test_metrics_match_full_evaluation(self):
+        _, checkpoints = evaluate_stream(SpaceSaving(100), self.stream, chunk_size=3000)
+        estimator = SpaceSaving(100)
+        for k in self.stream.tolist():
+            estimator.update(k, 1)
+        actual_counts = Counter(self.stream.tolist())
+        errors = [abs(estimator.query(k) - v) for k, v in actual_counts.items()]
+        self.assertAlmostEqual(checkpoints[-1]["aae"], np.mean(errors))
+        self.assertAlmostEqual(checkpoints[-1]["are"], np.mean([e / v for e, v in zip(errors, actual_counts.values())]))
+
+
+if __name__ == '__main__':
+    unittest.main()
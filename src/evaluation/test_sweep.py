@@ -0,0 +1,34 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+
+from estimators.space_saving import SpaceSaving
+from estimators.count_min import CountMin
+from evaluation.streaming import evaluate_stream
+from evaluation.sweep import sweep
+
+class TestSweep(unittest.TestCase):
+
+    def test_matches_separate_evaluations(self):
+        stream = np.random.default_rng(0).zipf(1.3, 20000).astype(np.uint64)
+        configs = [
+            ("SS", lambda size: SpaceSaving(size), {"size": 64}),
+            ("SS", lambda size: SpaceSaving(size), {"size": 256}),
+            ("CM", lambda width: CountMin(width, 4, seed=0), {"width": 128}),
+        ]
+        rows = sweep(stream, configs, chunk_size=3000, k=50, checkpoint_every=10000)
+        self.assertEqual(len(rows), 2 * len(configs))
+        self.assertEqual([r["packets"] for r in rows], [10000] * 3 + [20000] * 3)
+        for row, (name, factory, params) in zip(rows[3:], configs):
+            self.assertEqual(row["estimator"], name)
+            _, checkpoints = evaluate_stream(factory(**params), stream, chunk_size=3000, k=50)
+            for metric in ["mse", "aae", "are", "recall"]:
+                self.assertAlmostEqual(row[metric], checkpoints[-1][metric])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import tempfile
+import numpy as np
+
+from misc.traces import (read_trace, read_sizes, iter_chunks, iter_weighted_chunks, sidecar_path, sizes_path,
+                         write_weighted_trace, trace_hash)
+
+class TestTraces(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "test.trace")
+        self.keys = [5, 0, 2**64 - 1, 17, 17, 3]
+        with open(self.path, "w") as f:
+            f.write("\n".join(str(k) for k in self.keys) + "\n")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_read_trace(self):
+        trace = read_trace(self.path)
+        self.assertEqual(trace.dtype, np.uint64)
+        self.assertEqual(trace.tolist(), self.keys)
+        self.assertTrue(os.path.exists(sidecar_path(self.path)))
+
+    def test_prefix(self):
+        self.assertEqual(read_trace(self.path, 3).tolist(), self.keys[:3])
+        with self.assertRaises(ValueError):
+            read_trace(self.path, len(self.keys) + 1)
+
+    def test_sidecar_is_reused(self):
+        read_trace(self.path)
+        mtime = os.path.getmtime(sidecar_path(self.path))
+        self.assertEqual(read_trace(self.path).tolist(), self.keys)
+        self.assertEqual(os.path.getmtime(sidecar_path(self.path)), mtime)
+
+    def test_iter_chunks(self):
+        chunks = list(iter_chunks(self.path, 4))
+        self.assertEqual([c.tolist() for c in chunks], [self.keys[:4], self.keys[4:]])
+        chunks = list(iter_chunks(np.arange(10), 3, n=7))
+        self.assertEqual([len(c) for c in chunks], [3, 3, 1])
+
+    def test_weighted_trace(self):
+        path = os.path.join(self.dir.name, "weighted.trace")
+        sizes = [64, 1500, 576, 64, 64, 1500]
+        write_weighted_trace(path, self.keys, sizes)
+        self.assertEqual(read_trace(path).tolist(), self.keys)
+        self.assertEqual(read_sizes(path).tolist(), sizes)
+        self.assertEqual(read_sizes(path, 2).tolist(), sizes[:2])
+        chunks = list(iter_weighted_chunks(path, 4))
+        self.assertEqual([(k.tolist(), s.tolist()) for k, s in chunks],
+                         [(self.keys[:4], sizes[:4]), (self.keys[4:], sizes[4:])])
+        with self.assertRaises(ValueError):
+            read_sizes(self.path)
+
+    def test_weighted_trace_rewritten(self):
+        path = os.path.join(self.dir.name, "weighted.trace")
+        write_weighted_trace(path, self.keys, [64] * len(self.keys))
+        self.assertNotEqual(trace_hash(path, weighted=True), trace_hash(path))
+        read_sizes(path)
+        # rewritten without sizes, the old sizes must not survive
+        with open(path, "w") as f:
+            f.write("1\n2\n")
+        later = os.path.getmtime(sidecar_path(path)) + 1
+        os.utime(path, (later, later))
+        self.assertEqual(read_trace(path).tolist(), [1, 2])
+        self.assertFalse(os.path.exists(sizes_path(path)))
+        with self.assertRaises(ValueError):
+            read_sizes(path)
+
+    def test_mixed_trace(self):
+        path = os.path.join(self.dir.name, "mixed.trace")
+        with open(path, "w") as f:
+            f.write("1 64\n2\n")
+        with self.assertRaises(ValueError):
+            read_trace(path)
+        # no partial sidecars are left behind
+        self.assertEqual(sorted(os.listdir(self.dir.name)), ["mixed.trace", "test.trace"])
+
+
+if __name__ == '__main__':
+    unittest.main()
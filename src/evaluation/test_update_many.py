@@ -0,0 +1,57 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import random
+import numpy as np
+
+from estimators.space_saving import SpaceSaving
+from estimators.frequent import Frequent
+from estimators.effective_space_saving import EffectiveSpaceSaving
+from estimators.rap import RandomAdmissionPolicy
+from estimators.mean_tail import MeanTail
+
+class TestUpdateMany(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        keys = rng.zipf(1.3, 5000) % 1000
+        # repeat keys so batches contain runs of the same key
+        self.stream = np.repeat(keys, rng.integers(1, 4, len(keys)))
+        self.values = rng.integers(1, 5, len(self.stream))
+
+    def assert_same_as_update(self, factory, values=None):
+        random.seed(0)
+        sequential = factory()
+        for i, k in enumerate(self.stream.tolist()):
+            sequential.update(k, 1 if values is None else int(values[i]))
+        random.seed(0)
+        batched = factory()
+        for chunk in range(0, len(self.stream), 1000):
+            batched.update_many(self.stream[chunk:chunk + 1000], None if values is None else values[chunk:chunk + 1000])
+        for k in np.unique(self.stream).tolist():
+            self.assertEqual(batched.query(k), sequential.query(k))
+
+    def test_space_saving(self):
+        self.assert_same_as_update(lambda: SpaceSaving(100))
+        self.assert_same_as_update(lambda: SpaceSaving(100), self.values)
+
+    def test_frequent(self):
+        self.assert_same_as_update(lambda: Frequent(100))
+        self.assert_same_as_update(lambda: Frequent(100), self.values)
+
+    def test_effective_space_saving(self):
+        self.assert_same_as_update(lambda: EffectiveSpaceSaving(100, 0.125))
+
+    def test_rap(self):
+        self.assert_same_as_update(lambda: RandomAdmissionPolicy(100))
+        self.assert_same_as_update(lambda: RandomAdmissionPolicy(100), self.values)
+
+    def test_mean_tail(self):
+        self.assert_same_as_update(lambda: MeanTail(100, 0.125))
+
+
+if __name__ == '__main__':
+    unittest.main()
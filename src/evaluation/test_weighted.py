@@ -0,0 +1,67 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+
+from estimators.space_saving import SpaceSaving
+from estimators.rap import RandomAdmissionPolicy
+from estimators.mean_tail import MeanTail
+from evaluation.streaming import evaluate_stream
+
+class TestWeighted(unittest.TestCase):
+
+    def admissions(self, factory, fill, key, value, trials=2000):
+        admitted = 0
+        for seed in range(trials):
+            estimator = factory(seed)
+            for k, v in fill:
+                estimator.update(k, v)
+            estimator.update(key, value)
+            admitted += estimator.query(key) > 0
+        return admitted / trials
+
+    def test_rap_admission(self):
+        factory = lambda seed: RandomAdmissionPolicy(1, seed=seed)
+        # value / (min + value)
+        self.assertAlmostEqual(self.admissions(factory, [(1, 300)], 2, 100), 0.25, delta=0.04)
+        self.assertAlmostEqual(self.admissions(factory, [(1, 100)], 2, 1), 1 / 101, delta=0.01)
+
+    def test_rap_update_many_weighted(self):
+        rap = RandomAdmissionPolicy(1, seed=0)
+        rap.update_many(np.array([1, 2], dtype=np.uint64), np.array([100, 10**9]))
+        # admission is next to certain for a value that dwarfs the minimum
+        self.assertEqual(rap.query(2), 10**9 + 100)
+
+    def test_mean_tail_promotions(self):
+        factory = lambda seed: MeanTail(2, 0.5, seed=seed)
+        # counters {1: 1}, tail {2: 1}; a large value is almost always admitted
+        self.assertGreater(self.admissions(factory, [(1, 1), (2, 1)], 3, 10**6), 0.99)
+        # to the counters: value / max(value, value + min - average)
+        fill = [(1, 300), (2, 100)]
+        promoted = 0
+        for seed in range(2000):
+            mt = factory(seed)
+            for k, v in fill:
+                mt.update(k, v)
+            mt.update(2, 100)
+            promoted += 2 in mt.counters
+        self.assertAlmostEqual(promoted / 2000, 100 / 300, delta=0.04)
+
+    def test_evaluate_weighted_stream(self):
+        rng = np.random.default_rng(0)
+        keys = (rng.zipf(1.3, 5000) % 100).astype(np.uint64)
+        sizes = rng.choice([64, 1500], len(keys)).astype(np.uint32)
+        truth, checkpoints = evaluate_stream(SpaceSaving(128), (keys, sizes), chunk_size=700,
+                                             checkpoint_every=2000, weighted=True)
+        self.assertEqual(truth.total, int(sizes.sum(dtype=np.int64)))
+        self.assertEqual(len(checkpoints), 3)
+        self.assertEqual([c["packets"] for c in checkpoints], [2000, 4000, len(keys)])
+        self.assertEqual(checkpoints[-1]["bytes"], truth.total)
+        self.assertEqual(checkpoints[-1]["aae"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
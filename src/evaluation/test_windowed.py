@@ -0,0 +1,102 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+from functools import partial
+from collections import Counter
+import numpy as np
+
+from estimators.rap import RandomAdmissionPolicy
+from estimators.mean_tail import MeanTail
+from estimators.windowed import JumpingWindow, Decayed
+from evaluation.windowed import window_counts, decayed_counts, evaluate_windowed
+from misc.workload import Workload
+
+class TestWindowed(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = (np.random.default_rng(0).zipf(1.3, 2600) % 200).astype(np.uint64)
+        # tables larger than the domain count exactly
+        self.exact = partial(RandomAdmissionPolicy, 256, seed=0)
+
+    def test_jumping_window(self):
+        window = JumpingWindow(self.exact, 1000, panes=4)
+        window.update_many(self.stream[:1300])
+        for key in self.stream[1300:].tolist():
+            window.update(key, 1)
+        # the current pane 2500..2599 and the three before it
+        expected = Counter(self.stream[1750:].tolist())
+        self.assertEqual({k: v for k, v in window.items()}, expected)
+        self.assertEqual(window.query(int(self.stream[0])), expected[int(self.stream[0])])
+        self.assertEqual(window.top_k(1)[0][1], max(expected.values()))
+
+    def test_jumping_window_timestamps(self):
+        window = JumpingWindow(self.exact, 10.0, panes=2)
+        window.update(1, 1, timestamp=0.0)
+        window.update(2, 1, timestamp=6.0)
+        window.update(3, 1, timestamp=11.0)
+        self.assertEqual((window.query(1), window.query(2), window.query(3)), (0, 1, 1))
+        window.update(4, 1, timestamp=100.0)
+        self.assertEqual(dict(window.items()), {4: 1})
+
+    def test_decayed(self):
+        half_life = 100
+        sequential = Decayed(self.exact(), half_life)
+        for key in self.stream.tolist():
+            sequential.update(key, 1)
+        batched = Decayed(self.exact(), half_life)
+        for chunk in np.array_split(self.stream, 7):
+            batched.update_many(chunk)
+        truth = decayed_counts(self.stream, np.arange(len(self.stream)), len(self.stream) - 1, half_life)
+        for decayed in [sequential, batched]:
+            np.testing.assert_allclose(decayed.query_many(truth.keys), truth.counts)
+            self.assertLess(decayed.landmark, len(self.stream))
+            self.assertGreater(decayed.landmark, len(self.stream) - 2 * half_life)
+
+    def test_truth(self):
+        keys = np.array([1, 2, 1, 3], dtype=np.uint64)
+        times = np.array([0.0, 1.0, 2.0, 3.0])
+        truth = window_counts(keys, times, 3.0, 2.0)
+        self.assertEqual(dict(zip(truth.keys.tolist(), truth.counts.tolist())), {1: 1, 3: 1})
+        truth = decayed_counts(keys, times, 2.0, 1.0)
+        np.testing.assert_allclose(truth.get(np.array([1, 2, 3], dtype=np.uint64)), [1.25, 0.5, 0.0])
+
+    def test_evaluate_windowed(self):
+        keys, times = Workload(1000, a=1.2, phase_length=5000, churn=0.5, rng=0).generate(20000, timestamps=True)
+        checkpoints = evaluate_windowed(JumpingWindow(partial(MeanTail, 128, 0.125, seed=0), 4000.0, panes=8),
+                                        keys, times, window=4000.0, checkpoint_every=5000, k=10)
+        self.assertEqual([c["position"] for c in checkpoints], [5000, 10000, 15000, 20000])
+        self.assertTrue(all(c["recall"] >= 0.5 for c in checkpoints))
+        checkpoints = evaluate_windowed(Decayed(MeanTail(128, 0.125, seed=0, rounded=False), 2000.0), keys, times,
+                                        half_life=2000.0, checkpoint_every=5000, k=10)
+        self.assertTrue(all(c["recall"] >= 0.5 for c in checkpoints))
+        with self.assertRaises(ValueError):
+            evaluate_windowed(Decayed(MeanTail(128, 0.125, rounded=False), 1.0), keys, times)
+
+    def test_decayed_tail(self):
+        # after a phase change the stale tail keys decay with their true
+        # counts instead of staying at one count in the scaled domain
+        rng = np.random.default_rng(0)
+        stream = np.concatenate([rng.zipf(1.3, 3000) % 100, rng.integers(1000, 1004, 500)]).astype(np.uint64)
+        mean_tail = MeanTail(16, 0.25, seed=0, rounded=False)
+        decayed = Decayed(mean_tail, 50)
+        decayed.update_many(stream)
+        tail = np.array(list(mean_tail.tail_index.keys()), dtype=np.uint64)
+        self.assertTrue(np.all(tail < 100))
+        truth = decayed_counts(stream, np.arange(len(stream)), len(stream) - 1, 50)
+        estimates = decayed.query_many(tail)
+        self.assertTrue(np.all(estimates > 0))
+        self.assertTrue(np.all(estimates < 4 * truth.get(tail).mean()))
+
+    def test_decayed_needs_float_counts(self):
+        for estimator in [RandomAdmissionPolicy(16, backend="array"), MeanTail(16, 0.25)]:
+            with self.assertRaises(ValueError):
+                Decayed(estimator, 100)
+        with self.assertRaises(ValueError):
+            RandomAdmissionPolicy(16, backend="array").scale(0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+
+from misc.workload import Workload
+
+def workload(seed):
+    return Workload(5000, 1.3, phase_length=40000, churn=0.5, burst_rate=5e-5, burst_length=5000,
+                    burst_share=0.2, background=0.1, diurnal_period=50000, rng=seed)
+
+class TestWorkload(unittest.TestCase):
+
+    def test_chunk_size_does_not_change_stream(self):
+        whole, times = workload(3).generate(100000, timestamps=True)
+        chunks = list(workload(3).generate_chunks(100000, chunk=7777))
+        self.assertEqual([len(c) for c in chunks[:-1]], [7777] * (len(chunks) - 1))
+        np.testing.assert_array_equal(np.concatenate(chunks), whole)
+        self.assertEqual(len(times), 100000)
+        self.assertTrue(np.all(np.diff(times) > 0))
+        self.assertFalse(np.array_equal(workload(4).generate(100000), whole))
+
+    def test_churn_and_bursts(self):
+        w = workload(0)
+        first, second = w.generate(40000), w.generate(40000)
+        top = lambda keys: np.bincount(keys.astype(np.int64)).argsort()[::-1][:20]
+        self.assertLess(len(set(top(first)) & set(top(second))), 20)
+        self.assertTrue(w.bursts)
+        for start, end, key, share in w.bursts:
+            self.assertGreaterEqual(key, 5000)
+            stream = np.concatenate([first, second])[start:min(end, 80000)]
+            if len(stream) > 1000:
+                self.assertAlmostEqual(np.mean(stream == key), share, delta=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
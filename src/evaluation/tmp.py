@@ -4,63 +4,39 @@ import numpy as np
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from collections import Counter
 import matplotlib.pyplot as plt
 
 from estimators.rap import RandomAdmissionPolicy
 from estimators.mean_tail import MeanTail
+from misc.traces import read_trace
+from misc.counts import trace_counts
+from evaluation.streaming import query_many
 
 
-def read_trace(file_path, n=None):
-    with open(file_path, "r") as file:
-        if n is not None:
-            return [int(next(file).strip()) for _ in range(n)]
-        else:
-            return [int(line.strip()) for line in file]
-
 trace_file = "src/traces/youtube.trace"
 trace_len = 1000000
 estimator_len = 2**10
 print('read trace...')
 trace = read_trace(trace_file, trace_len)
 print('find actual counts...')
-actual_counts = Counter(trace)
+actual_counts = trace_counts(trace_file, trace_len)
 
 rap = RandomAdmissionPolicy(estimator_len)
 mt = MeanTail(estimator_len, 0.125)
 
 print('update:')
-i = 0
-for v in trace:
-    if i % (len(trace) // 5) == 0:
-        print('*', end="", flush=True)
-    i += 1
-    rap.update(v, 1)
-for v in trace:
-    if i % (len(trace) // 5) == 0:
-        print('*', end="", flush=True)
-    i += 1
-    mt.update(v, 1)
-print("")
+rap.update_many(trace)
+mt.update_many(trace)
 print('query:')
-i = 0
-rap_estimates = {}
-mt_estimates = {}
-for k in actual_counts.keys():
-    if i % (len(actual_counts) // 10) == 0:
-        print('*', end="", flush=True)
-    i += 1
-    rap_estimates[k] = rap.query(k)
-    mt_estimates[k] = mt.query(k)
-print("")
-vs = [(k, actual_counts[k], rap_estimates[k], mt_estimates[k]) for k in actual_counts.keys()]
-vs = sorted(vs, key=lambda v: v[1])
-xs = list(range(len(vs)))
-ys_actual = [v[1] for v in vs]
-ys_rap = [v[2] for v in vs]
-ys_mt = [v[3] for v in vs]
-es_rap = [(y_rap - y_actual)**2 for y_rap, y_actual in zip(ys_rap, ys_actual)]
-es_mt = [(y_mt - y_actual)**2 for y_mt, y_actual in zip(ys_mt, ys_actual)]
+rap_estimates = query_many(rap, actual_counts.keys)
+mt_estimates = query_many(mt, actual_counts.keys)
+order = np.argsort(actual_counts.counts, kind="stable")
+xs = np.arange(len(order))
+ys_actual = actual_counts.counts[order]
+ys_rap = rap_estimates[order]
+ys_mt = mt_estimates[order]
+es_rap = (ys_rap - ys_actual)**2
+es_mt = (ys_mt - ys_actual)**2
 
 
 print("RAP", np.average(es_rap), "MT", np.average(es_mt))
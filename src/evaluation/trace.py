@@ -1,6 +1,5 @@
 import sys
 import os
-from collections import Counter
 from concurrent.futures import ProcessPoolExecutor, as_completed
 import matplotlib.pyplot as plt
 import numpy as np
@@ -13,24 +12,16 @@ from estimators.auto_dist_counters import AutoDistCounters
 from estimators.rap import RandomAdmissionPolicy
 from estimators.space_saving import SpaceSaving
 import misc.distribution as dist
+from misc.traces import read_trace
+from misc.counts import trace_counts
 from evaluation.fit_zipfian import estimate_params, lognormal_fit
-
-def read_trace(file_path, n=None):
-    with open(file_path, "r") as file:
-        if n is not None:
-            return [int(next(file).strip()) for _ in range(n)]
-        else:
-            return [int(line.strip()) for line in file]
+from evaluation.streaming import evaluate_stream, query_many
+from evaluation.metrics import aae, are
 
 def evaluate(estimator, stream):
-    for i, e in enumerate(stream):
-        estimator.update(e, 1)
-    actual_counts = Counter(stream)
-    estimate_counts = {k: estimator.query(k) for k in actual_counts}
-    errors = {k: abs(estimate_counts[k] - a) for k, a in actual_counts.items()}
-    aae = sum(errors.values())
-    are = sum([errors[k] / v for k, v in actual_counts.items()]) / len(actual_counts)
-    return are, aae
+    actual_counts, _ = evaluate_stream(estimator, np.asarray(stream))
+    estimates = query_many(estimator, actual_counts.keys)
+    return are(actual_counts.counts, estimates), aae(actual_counts.counts, estimates) * len(actual_counts)
 
 def sort_results_by_estimator_length(results):
     # Combine the lists into tuples and sort them by the first element (Estimator Length)
@@ -73,24 +64,19 @@ def main():
 
     plot_results(sort_results_by_estimator_length(results))
 
-def dc_best_possible_are(stream, prob, estimator_length):
-    actual_counts = Counter(stream)
-    estimate_counts = {k: 0 for k in actual_counts}
+def dc_best_possible_are(actual_counts, prob, estimator_length):
     logger.info(f"stream unique counts {len(actual_counts)}")
-    for n, (k, _) in enumerate(actual_counts.most_common()):
-        if n < estimator_length:
-            estimate_counts[k] = prob(n) * len(stream)
-        else:
-            break
-    errors = {k: abs(estimate_counts[k] - a) for k, a in actual_counts.items()}
-    are = sum([errors[k] / v for k, v in actual_counts.items()]) / len(actual_counts)
-    return are
+    estimates = np.zeros(len(actual_counts))
+    by_rank = np.argsort(-actual_counts.counts, kind="stable")[:int(estimator_length)]
+    estimates[by_rank] = prob(np.arange(len(by_rank))) * actual_counts.total
+    return are(actual_counts.counts, estimates)
 
 def process_trace(trace_file, trace_len, trace_ratio):
     logger.info("reading trace...")
     trace = read_trace(trace_file, trace_len)
+    actual_counts = trace_counts(trace_file, trace_len)
     logger.info("finding zipf parameter...")
-    params = estimate_params(trace)
+    params = estimate_params(trace, actual_counts)
     zipf_param = params["Zipfian"]
     log_normal_param = params["Log-normal"]
     estimator_size = trace_ratio * trace_len
@@ -98,7 +84,7 @@ def process_trace(trace_file, trace_len, trace_ratio):
     ss = SpaceSaving(estimator_size)
     log_normal_function = lambda x: lognormal_fit(x, log_normal_param[0], log_normal_param[1])
     logger.info('checking lognormal errors...')
-    dc_limit_log_normal = None # dc_best_possible_are(trace, log_normal_function, estimator_size * 2)
+    dc_limit_log_normal = None # dc_best_possible_are(actual_counts, log_normal_function, estimator_size * 2)
     adc = AutoDistCounters(int(estimator_size * 1))
     dc = DistCounters(int(estimator_size * 1), log_normal_function)
     logger.info('eval dc...')
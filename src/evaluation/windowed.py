@@ -0,0 +1,49 @@
+import numpy as np
+
+from misc.counts import KeyCounts
+from evaluation.streaming import error_metrics
+
+# Evaluation of the windowed estimators (estimators.windowed) against the
+# ground truth of the window they answer for: at every checkpoint the exact
+# counts of the packets in the last window, or the exponentially decayed
+# counts of every packet so far. Keys and timestamps are arrays, timestamps
+# sorted, e.g. from Workload.generate(n, timestamps=True); without
+# timestamps the time of a packet is its position.
+
+def window_counts(keys, timestamps, end, window):
+    # exact counts of the packets with end - window < timestamp <= end
+    low, high = np.searchsorted(timestamps, [end - window, end], side="right")
+    truth = KeyCounts()
+    truth.add(keys[low:high])
+    return truth
+
+def decayed_counts(keys, timestamps, end, half_life):
+    # sum of 2**(-(end - timestamp) / half_life) per key, up to end
+    high = np.searchsorted(timestamps, end, side="right")
+    truth = KeyCounts(counts=np.zeros(0))
+    truth.add(keys[:high], np.exp2(-(end - timestamps[:high]) / half_life))
+    return truth
+
+def evaluate_windowed(estimator, keys, timestamps=None, window=None, half_life=None,
+                      checkpoint_every=2**16, chunk_size=2**14, k=None):
+    # one row of metrics per checkpoint, against window_counts if window is
+    # given, decayed_counts if half_life is
+    if (window is None) == (half_life is None):
+        raise ValueError("give exactly one of window and half_life")
+    keys = np.asarray(keys)
+    timestamps = np.arange(len(keys)) if timestamps is None else np.asarray(timestamps)
+    checkpoints = []
+    for start in range(0, len(keys), checkpoint_every):
+        end = min(start + checkpoint_every, len(keys))
+        for chunk in range(start, end, chunk_size):
+            stop = min(chunk + chunk_size, end)
+            estimator.update_many(keys[chunk:stop], timestamps=timestamps[chunk:stop])
+        now = timestamps[end - 1]
+        if window is not None:
+            truth = window_counts(keys, timestamps, now, window)
+        else:
+            truth = decayed_counts(keys, timestamps, now, half_life)
+        result = {"position": end, "time": float(now)}
+        result.update(error_metrics(estimator, truth, k))
+        checkpoints.append(result)
+    return checkpoints
@@ -0,0 +1,95 @@
+import os
+import numpy as np
+
+from misc.traces import read_trace, iter_chunks, sidecar_path
+
+class KeyCounts:
+    # Exact per-key counts kept as parallel sorted arrays of unique keys and
+    # their counts, merged chunk by chunk so a stream never has to be held
+    # in memory as Python ints.
+    def __init__(self, keys=None, counts=None):
+        self.keys = np.zeros(0, dtype=np.uint64) if keys is None else np.asarray(keys)
+        self.counts = np.zeros(0, dtype=np.int64) if counts is None else np.asarray(counts)
+        self.total = int(self.counts.sum())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, chunk, values=None):
+        chunk = np.asarray(chunk)
+        if values is None:
+            keys, counts = np.unique(chunk, return_counts=True)
+        else:
+            keys, inverse = np.unique(chunk, return_inverse=True)
+            counts = np.bincount(inverse, weights=values, minlength=len(keys)).astype(self.counts.dtype)
+        self.merge(keys, counts)
+
+    def merge(self, keys, counts):
+        # keys must be sorted and unique
+        if len(self.keys) == 0:
+            self.keys, self.counts = keys.copy(), counts.astype(self.counts.dtype)
+            self.total = int(self.counts.sum())
+            return
+        positions = np.searchsorted(self.keys, keys)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == keys[found]
+        self.counts[positions[found]] += counts[found]
+        missing = ~found
+        self.keys = np.insert(self.keys, positions[missing], keys[missing])
+        self.counts = np.insert(self.counts, positions[missing], counts[missing])
+        self.total += int(counts.sum())
+
+    def get(self, keys):
+        # counts of the given keys, 0 for keys never seen
+        keys = np.asarray(keys)
+        positions = np.minimum(np.searchsorted(self.keys, keys), max(len(self.keys) - 1, 0))
+        if len(self.keys) == 0:
+            return np.zeros(len(keys), dtype=self.counts.dtype)
+        return np.where(self.keys[positions] == keys, self.counts[positions], 0)
+
+    def rank_frequencies(self):
+        # counts in decreasing order, index 0 is the most frequent key
+        return np.sort(self.counts)[::-1]
+
+# Exact counts of trace prefixes, cached next to the trace as sorted
+# key/count arrays. A prefix that is not cached yet is derived from the
+# longest cached shorter prefix by counting only the remaining keys.
+
+COUNT_CHUNK = 1 << 22
+
+def counts_path(file_path, n):
+    return f"{sidecar_path(file_path)}.counts-{n}.npz"
+
+def cached_prefixes(file_path):
+    directory = os.path.dirname(os.path.abspath(file_path))
+    prefix = os.path.basename(sidecar_path(file_path)) + ".counts-"
+    lengths = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(".npz"):
+            length = name[len(prefix):-len(".npz")]
+            if length.isdigit():
+                lengths.append(int(length))
+    return sorted(lengths)
+
+def _load(path):
+    with np.load(path) as data:
+        return KeyCounts(data["keys"], data["counts"])
+
+def trace_counts(file_path, n=None):
+    trace = read_trace(file_path)
+    n = len(trace) if n is None else n
+    if n > len(trace):
+        raise ValueError(f"{file_path} has {len(trace)} keys, {n} requested")
+    trace_mtime = os.path.getmtime(sidecar_path(file_path))
+    fresh = [m for m in cached_prefixes(file_path) if m <= n and os.path.getmtime(counts_path(file_path, m)) >= trace_mtime]
+    if fresh and fresh[-1] == n:
+        return _load(counts_path(file_path, n))
+    start = fresh[-1] if fresh else 0
+    counts = _load(counts_path(file_path, start)) if fresh else KeyCounts()
+    for chunk in iter_chunks(trace[start:n], COUNT_CHUNK):
+        counts.add(chunk)
+    path = counts_path(file_path, n)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, keys=counts.keys, counts=counts.counts)
+    os.replace(tmp_path, path)
+    return counts
@@ -1,19 +1,42 @@
 import numpy as np
-import scipy
 from scipy.stats import norm, uniform, binom, poisson, expon, zipf
 
+# Key distributions over a finite domain [0, domain). The probability of every
+# key is tabulated once, keys are sampled by inverse CDF with searchsorted and
+# probability(rank) reads the rank-th largest probability, rank 0 being the
+# most frequent key. rng is a np.random.Generator or a seed for one, so the
+# same seed always generates the same stream. Without one the Generator is
+# seeded from the global NumPy state, so np.random.seed() before construction
+# still makes a run reproducible.
+
+def default_rng(rng=None):
+    if rng is None:
+        rng = np.random.randint(0, 2**63, dtype=np.int64)
+    return np.random.default_rng(rng)
+
 class Distribution:
-    def __init__(self, probabilities):
-        self.sorted_probabilities = sorted(probabilities, reverse=True)
+    def __init__(self, probabilities, rng=None):
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.key_probabilities = probabilities / probabilities.sum()
+        self.cdf = np.cumsum(self.key_probabilities)
+        self.cdf[-1] = 1.0
+        self.sorted_probabilities = np.sort(self.key_probabilities)[::-1]
+        self.rng = default_rng(rng)
 
     def generate(self, n):
-        raise NotImplementedError("Generate method not implemented!")
+        return np.searchsorted(self.cdf, self.rng.random(n), side="right").astype(np.uint64)
+
+    def generate_chunks(self, n, chunk=2**20):
+        # the concatenated chunks are the same stream as generate(n)
+        for start in range(0, n, chunk):
+            yield self.generate(min(chunk, n - start))
 
     def probability(self, n):
+        # scalar or array of 0-based ranks
         return self.sorted_probabilities[n]
 
 class NormalDistribution(Distribution):
-    def __init__(self, domain, probability_out_of_bound=0.001):
+    def __init__(self, domain, probability_out_of_bound=0.001, rng=None):
         self.domain = domain
 
         self.mean = domain / 2
@@ -21,45 +44,34 @@ class NormalDistribution(Distribution):
 
         x_values = np.arange(domain)
         probabilities = norm.pdf(x_values, self.mean, self.std)
-        super().__init__(probabilities)
-
-    def generate(self, n):
-        return np.clip(np.round(np.random.normal(self.mean, self.std, n)), 0, self.domain)
+        super().__init__(probabilities, rng)
 
 class UniformDistribution(Distribution):
-    def __init__(self, domain):
+    def __init__(self, domain, rng=None):
         self.low = 0
         self.high = domain
-        probabilities = np.full(domain, 1/domain) 
-        super().__init__(probabilities)
+        probabilities = np.full(domain, 1/domain)
+        super().__init__(probabilities, rng)
 
     def generate(self, n):
-        return np.round(np.random.uniform(self.low, self.high, n))
+        return self.rng.integers(self.low, self.high, n, dtype=np.uint64)
 
 
 class ExponentialDistribution(Distribution):
-    def __init__(self, domain, probability_out_of_bounds=0.01):
+    def __init__(self, domain, probability_out_of_bounds=0.01, rng=None):
         self.upper_bound = -np.log(probability_out_of_bounds)
         x_values = np.linspace(0, self.upper_bound, domain)
         probabilities = expon.pdf(x_values)
-        probabilities *= 1 / sum(probabilities) # normalize
         self.domain = domain
-        super().__init__(probabilities)
-
-    def generate(self, n):
-        return np.clip(np.round(self.domain / self.upper_bound * np.random.exponential(1, n)), 0, self.domain)
+        super().__init__(probabilities, rng)
 
 class ZipfianDistribution(Distribution):
-    def __init__(self, domain, a=1.5):
+    def __init__(self, domain, a=1.5, rng=None):
+        # normalized over the finite domain, key k has rank k
         self.domain = domain
         self.a = a
-        super().__init__([])
-   
+        probabilities = np.float_power(np.arange(1, domain + 1), -a)
+        super().__init__(probabilities, rng)
+
     def probability(self, n):
-        H_N_a = scipy.special.zetac(self.a) + 1  # zetac(a) gives H(∞, a) - 1
-        # Calculate the probability
-        P_n = (1 / n**self.a) / H_N_a
-        return P_n    
-    
-    def generate(self, n):
-        return np.random.zipf(self.s, n) % self.domain
\ No newline at end of file
+        return self.key_probabilities[n]
@@ -0,0 +1,130 @@
+import os
+import hashlib
+from contextlib import nullcontext
+import numpy as np
+
+# Traces are text files with one integer key per line. The first read
+# converts a trace into a raw little-endian uint64 sidecar next to it,
+# later reads memory-map the sidecar, so parallel workers share the page
+# cache instead of re-parsing the text.
+# Weighted traces have "key size" lines, e.g. packet sizes in bytes, and get
+# a second uint32 sidecar of sizes, read with read_sizes(). The first line
+# decides which kind a trace is, every other line must match it, and every
+# conversion rewrites or removes the sizes sidecar.
+
+KEY_DTYPE = np.dtype("<u8")
+SIZE_DTYPE = np.dtype("<u4")
+PARSE_CHUNK_BYTES = 1 << 24
+
+def sidecar_path(file_path):
+    return file_path + ".u64"
+
+def sizes_path(file_path):
+    return file_path + ".sizes.u32"
+
+def _is_fresh(sidecar, file_path):
+    return os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(file_path)
+
+def convert_trace(file_path):
+    sidecar = sidecar_path(file_path)
+    if _is_fresh(sidecar, file_path):
+        return sidecar
+    # write to a private file first so concurrent workers never see a
+    # partially written sidecar
+    tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+    sizes_tmp_path = f"{sizes_path(file_path)}.{os.getpid()}.tmp"
+    try:
+        with open(file_path, "r") as src:
+            weighted = len(src.readline().split()) == 2
+            src.seek(0)
+            with open(tmp_path, "wb") as dst, (open(sizes_tmp_path, "wb") if weighted else nullcontext()) as sizes:
+                while True:
+                    lines = src.readlines(PARSE_CHUNK_BYTES)
+                    if not lines:
+                        break
+                    if not weighted:
+                        np.array(list(map(int, lines)), dtype=np.uint64).astype(KEY_DTYPE).tofile(dst)
+                        continue
+                    fields = [line.split() for line in lines]
+                    if any(len(f) != 2 for f in fields):
+                        raise ValueError(f"{file_path} mixes lines with and without sizes")
+                    np.array([int(f[0]) for f in fields], dtype=np.uint64).astype(KEY_DTYPE).tofile(dst)
+                    np.array([int(f[1]) for f in fields], dtype=np.uint32).astype(SIZE_DTYPE).tofile(sizes)
+    except BaseException:
+        for path in (tmp_path, sizes_tmp_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    # the sizes are in place, or stale ones gone, before the keys sidecar
+    # makes the trace fresh
+    if weighted:
+        os.replace(sizes_tmp_path, sizes_path(file_path))
+    elif os.path.exists(sizes_path(file_path)):
+        os.remove(sizes_path(file_path))
+    os.replace(tmp_path, sidecar)
+    return sidecar
+
+def read_trace(file_path, n=None):
+    # read-only uint64 view of the first n keys of the trace
+    sidecar = convert_trace(file_path)
+    if os.path.getsize(sidecar) == 0:
+        trace = np.zeros(0, dtype=KEY_DTYPE)
+    else:
+        trace = np.memmap(sidecar, dtype=KEY_DTYPE, mode="r")
+    if n is not None:
+        if n > len(trace):
+            raise ValueError(f"{file_path} has {len(trace)} keys, {n} requested")
+        trace = trace[:n]
+    return trace
+
+def read_sizes(file_path, n=None):
+    # read-only uint32 view of the first n sizes of a weighted trace
+    convert_trace(file_path)
+    path = sizes_path(file_path)
+    if not os.path.exists(path):
+        raise ValueError(f"{file_path} has no sizes")
+    sizes = np.memmap(path, dtype=SIZE_DTYPE, mode="r") if os.path.getsize(path) else np.zeros(0, dtype=SIZE_DTYPE)
+    if n is not None:
+        if n > len(sizes):
+            raise ValueError(f"{file_path} has {len(sizes)} sizes, {n} requested")
+        sizes = sizes[:n]
+    return sizes
+
+def write_weighted_trace(file_path, keys, sizes):
+    with open(file_path, "w") as f:
+        for key, size in zip(np.asarray(keys, dtype=np.uint64).tolist(), np.asarray(sizes).tolist()):
+            f.write(f"{key} {size}\n")
+
+def trace_hash(file_path, n=None, weighted=False):
+    # content hash of the first n keys, identifies a trace prefix in results,
+    # with weighted set of the keys and sizes, so the two never share a hash
+    digest = hashlib.sha1()
+    if not weighted:
+        for chunk in iter_chunks(file_path, 1 << 20, n):
+            digest.update(np.ascontiguousarray(chunk).data)
+        return digest.hexdigest()
+    digest.update(b"weighted")
+    for keys, sizes in iter_weighted_chunks(file_path, 1 << 20, n):
+        digest.update(np.ascontiguousarray(keys).data)
+        digest.update(np.ascontiguousarray(sizes).data)
+    return digest.hexdigest()
+
+def iter_chunks(trace, chunk_size, n=None):
+    # zero-copy chunks of a trace given as a path or an array
+    if isinstance(trace, (str, os.PathLike)):
+        trace = read_trace(trace, n)
+    elif n is not None:
+        trace = trace[:n]
+    for start in range(0, len(trace), chunk_size):
+        yield trace[start:start + chunk_size]
+
+def iter_weighted_chunks(trace, chunk_size, n=None):
+    # zero-copy (keys, sizes) chunks of a weighted trace given as a path or
+    # a (keys, sizes) pair of arrays
+    if isinstance(trace, (str, os.PathLike)):
+        trace = read_trace(trace, n), read_sizes(trace, n)
+    keys, sizes = trace
+    if n is not None:
+        keys, sizes = keys[:n], sizes[:n]
+    for start in range(0, len(keys), chunk_size):
+        yield keys[start:start + chunk_size], sizes[start:start + chunk_size]
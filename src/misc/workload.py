@@ -0,0 +1,111 @@
+import numpy as np
+
+from misc.distribution import ZipfianDistribution, default_rng
+
+# Synthetic workloads with the churn of real traffic, on top of a Zipf law
+# over the ranks 0..domain-1:
+#   - piecewise stationarity: every phase_length packets a churn share of the
+#     ranks is reshuffled, so heavy hitters rise and fall,
+#   - flash crowds: bursts arrive at burst_rate per packet, each a fresh key
+#     taking burst_share of the packets for burst_length packets,
+#   - diurnal modulation: a uniform background share and the packet rate
+#     follow a sine of period diurnal_period packets.
+# Packets are produced in fixed blocks from a single np.random.Generator, so a
+# seed gives the same stream whatever chunk size it is read with, and memory
+# is bounded by the domain tables plus one chunk. A Workload is a stream,
+# every call continues where the previous one stopped.
+
+BLOCK = 1 << 16
+
+class Workload:
+    def __init__(self, domain, a=1.2, phase_length=None, churn=0.1,
+                 burst_rate=0.0, burst_length=100000, burst_share=0.05,
+                 background=0.0, diurnal_period=None, diurnal_amplitude=0.5,
+                 rate=1.0, rng=None):
+        self.rng = default_rng(rng)
+        self.zipf = ZipfianDistribution(domain, a, self.rng)
+        self.domain = domain
+        self.phase_length = phase_length
+        self.churn = churn
+        self.burst_rate = burst_rate
+        self.burst_length = burst_length
+        self.burst_share = burst_share
+        self.background = background
+        self.diurnal_period = diurnal_period
+        self.diurnal_amplitude = diurnal_amplitude
+        self.rate = rate
+        # keys[rank] is the key currently holding that rank
+        self.keys = self.rng.permutation(domain).astype(np.uint64)
+        self.next_key = domain
+        self.position = 0
+        self.time = 0.0
+        # every burst so far as (start, end, key, share)
+        self.bursts = []
+        self.active = []
+
+    def diurnal(self, positions):
+        # modulation factor around 1 of the given packet indexes
+        if self.diurnal_period is None:
+            return np.ones(len(positions))
+        return 1 + self.diurnal_amplitude * np.sin(2 * np.pi * positions / self.diurnal_period)
+
+    def reshuffle(self):
+        ranks = self.rng.choice(self.domain, int(self.churn * self.domain), replace=False)
+        self.keys[ranks] = self.keys[self.rng.permutation(ranks)]
+
+    def schedule_bursts(self, start, length):
+        for _ in range(self.rng.poisson(self.burst_rate * length)):
+            burst_start = start + int(self.rng.integers(length))
+            burst = (burst_start, burst_start + self.burst_length, np.uint64(self.next_key), self.burst_share)
+            self.next_key += 1
+            self.bursts.append(burst)
+            self.active.append(burst)
+
+    def block(self, length):
+        start = self.position
+        if self.phase_length and start and start % self.phase_length == 0:
+            self.reshuffle()
+        keys = self.keys[self.zipf.generate(length).astype(np.int64)]
+        positions = np.arange(start, start + length)
+        modulation = self.diurnal(positions)
+        if self.background:
+            mask = self.rng.random(length) < np.clip(self.background * modulation, 0, 1)
+            keys[mask] = self.keys[self.rng.integers(0, self.domain, np.count_nonzero(mask))]
+        if self.burst_rate:
+            self.schedule_bursts(start, length)
+            for burst_start, burst_end, key, share in self.active:
+                low, high = max(burst_start, start) - start, min(burst_end, start + length) - start
+                if low < high:
+                    keys[low:high][self.rng.random(high - low) < share] = key
+            self.active = [burst for burst in self.active if burst[1] > start + length]
+        # exponential inter-arrivals at the modulated rate
+        times = self.time + np.cumsum(self.rng.exponential(1.0, length) / (self.rate * np.maximum(modulation, 1e-9)))
+        self.time = times[-1]
+        self.position += length
+        return keys, times
+
+    def generate_chunks(self, n, chunk=2**20, timestamps=False):
+        # chunks of keys, or of (keys, timestamps) if timestamps is set
+        pending = []
+        pending_length = 0
+        remaining = n
+        while remaining > 0:
+            length = min(BLOCK, remaining)
+            if self.phase_length:
+                length = min(length, self.phase_length - self.position % self.phase_length)
+            pending.append(self.block(length))
+            pending_length += length
+            remaining -= length
+            while pending_length >= chunk or (remaining == 0 and pending_length):
+                keys = np.concatenate([block[0] for block in pending])
+                times = np.concatenate([block[1] for block in pending])
+                size = min(chunk, pending_length)
+                yield (keys[:size], times[:size]) if timestamps else keys[:size]
+                pending = [(keys[size:], times[size:])] if size < pending_length else []
+                pending_length -= size
+
+    def generate(self, n, timestamps=False):
+        chunks = list(self.generate_chunks(n, max(n, 1), timestamps))
+        if timestamps:
+            return chunks[0] if chunks else (np.zeros(0, dtype=np.uint64), np.zeros(0))
+        return chunks[0] if chunks else np.zeros(0, dtype=np.uint64)